@@ -1,9 +1,23 @@
-import random
+import bisect
+import functools
+import heapq
+import itertools
+import time
 import numpy as np
-import matplotlib.pyplot as plt
+from history import History
+from checkpoint import check_parameters, load_checkpoint, save_checkpoint
+from local_search import LOCAL_SEARCH_METHODS, improve_tour
+from parallel import RandomStream, SharedArray, create_pool, random_stream, split
+
+def kd_tree():
+    # o scipy é opcional, usado apenas para montar as listas de candidatos a partir das coordenadas
+    # e só é importado quando for usado, pois a importação demora mais que a de todo o restante do modulo
+    try:
+        from scipy.spatial import cKDTree
+    except ImportError:
+        return None
+    return cKDTree
 
-# Define a seed for the random number generator, para reproduzir os resultados
-random.seed(42)
 # classe que representa uma aresta do grafo, ou seja, o caminho entre dois pontos.
 class Arris():
     def __init__(self, 
@@ -17,13 +31,23 @@ class Arris():
         self.distance = distance
         self.pheromone = pheromone
 
+        # a ultima avaliação é guardada junto com os parametros usados, e só é recalculada quando algum deles muda
+        self.evaluation_key = None
+        self.evaluation = None
+
     # calcula a avaliação da aresta.
     # quanto maior a avaliação, maior a probabilidade de ser escolhida.
 
     def evaluate_arris(self, distance_expoent, pheromone_expoent):
-        # é usado o inverso da distancia, ou seja, é inversamente proporcional a distancia
-        distance_inverse = (1/self.distance)
-        return (distance_inverse**distance_expoent)*(self.pheromone**pheromone_expoent)
+        evaluation_key = (distance_expoent, pheromone_expoent, self.pheromone)
+
+        if self.evaluation_key != evaluation_key:
+            # é usado o inverso da distancia, ou seja, é inversamente proporcional a distancia
+            distance_inverse = (1/self.distance)
+            self.evaluation = (distance_inverse**distance_expoent)*(self.pheromone**pheromone_expoent)
+            self.evaluation_key = evaluation_key
+
+        return self.evaluation
     
     def update_pheromone(self, generation, update_constant, evaporation_constant):
         # Variável para armazenar a adição total de feromônio para esta aresta
@@ -56,40 +80,68 @@ class Roulette():
     def __init__(self, 
                  items:list, 
                  distance_expoent:float, 
-                 pheromone_expoent:float):
+                 pheromone_expoent:float, 
+                 rng:RandomStream=None):
         
         self.items = items
         self.distance_expoent = distance_expoent
         self.pheromone_expoent = pheromone_expoent
-        self.total = sum([item.evaluate_arris(self.distance_expoent, self.pheromone_expoent) for item in items])
-        self.probabilities = [item.evaluate_arris(self.distance_expoent, self.pheromone_expoent)/self.total for item in items]
+        # gerador de numeros aleatorios, por padrão um novo RandomStream
+        self.rng = rng if rng is not None else RandomStream()
+
+        # cada item é avaliado uma unica vez, e os pesos acumulados são guardados para todos os giros da roleta
+        self.evaluations = [item.evaluate_arris(self.distance_expoent, self.pheromone_expoent) for item in items]
+        self.cumulative_weights = list(itertools.accumulate(self.evaluations))
+        self.total = self.cumulative_weights[-1] if self.cumulative_weights else 0
+
+    @property
+    def probabilities(self):
+        return [evaluation/self.total for evaluation in self.evaluations]
         
     def spin(self):
         #Retorna um item aleatorio, com probabilidade proporcional a sua avaliação
-        return random.choices(self.items, weights=self.probabilities)[0]
+        #busca binaria nos pesos acumulados, como o random.choices, mas sem recalcular os pesos a cada giro
+        if self.total <= 0:
+            return self.rng.choice(self.items)
+        return self.items[bisect.bisect(self.cumulative_weights, self.rng.random()*self.total, 0, len(self.items) - 1)]
 
 class Tourney():
     def __init__(self, 
                  items:list, 
                  distance_expoent:float, 
-                 pheromone_expoent:float):
+                 pheromone_expoent:float, 
+                 rng:RandomStream=None):
         
         self.items = items
         self.distance_expoent = distance_expoent
         self.pheromone_expoent = pheromone_expoent
+        # gerador de numeros aleatorios, por padrão um novo RandomStream
+        self.rng = rng if rng is not None else RandomStream()
+
+        # avaliações já calculadas, indexadas pela posição do item
+        self.evaluations = {}
+
+    def evaluate(self, index:int):
+        if index not in self.evaluations:
+            self.evaluations[index] = self.items[index].evaluate_arris(self.distance_expoent, self.pheromone_expoent)
+        return self.evaluations[index]
 
     def compete(self):
-        competitor_1 = random.choice(self.items)
-        competitor_2 = random.choice(self.items)
+        index_1 = self.rng.randrange(len(self.items))
+        index_2 = self.rng.randrange(len(self.items))
+        competitor_1 = self.items[index_1]
+        competitor_2 = self.items[index_2]
+        evaluation_1 = self.evaluate(index_1)
+        evaluation_2 = self.evaluate(index_2)
         
         #Compara os competidores e retorna o vencedor
-        if competitor_1.evaluate_arris(self.distance_expoent, self.pheromone_expoent) > competitor_2.evaluate_arris(self.distance_expoent, self.pheromone_expoent):
+        if evaluation_1 > evaluation_2:
             return competitor_1
-        elif competitor_1.evaluate_arris(self.distance_expoent, self.pheromone_expoent) < competitor_2.evaluate_arris(self.distance_expoent, self.pheromone_expoent):
+        elif evaluation_1 < evaluation_2:
             return competitor_2
         # se os competidores tiverem a mesma avaliação, retorna um deles aleatoriamente
-        elif competitor_1.evaluate_arris(self.distance_expoent, self.pheromone_expoent) == competitor_2.evaluate_arris(self.distance_expoent, self.pheromone_expoent):
-            return random.choice([competitor_1, competitor_2])
+        elif evaluation_1 == evaluation_2:
+            return self.rng.choice([competitor_1, competitor_2])
         else:
             raise Exception("Error: Invalid evaluation")
 
@@ -99,7 +151,9 @@ class CompleteGraph():
                  distance_dict:dict, 
                  initial_pheromone:float=0.1):
         self.vertex_list = vertex_list
+        self.vertex_index = {vertex:i for i, vertex in enumerate(self.vertex_list)}
         self.distance_dict = distance_dict
+        self.owns_distance_dict = False
         self.initial_pheromone = initial_pheromone
 
         arris_list = []
@@ -115,13 +169,738 @@ class CompleteGraph():
 
         self.arris_list = arris_list
 
+        # indice das arestas por (origem, destino), evita percorrer a arris_list para encontrar uma aresta
+        self.arris_dict = {(arris.origin, arris.destination):arris for arris in self.arris_list}
+
+        # arestas que saem de cada vertice, na mesma ordem da arris_list
+        self.outgoing = {vertex:[] for vertex in vertex_list}
+        for arris in self.arris_list:
+            self.outgoing[arris.origin].append(arris)
+
+        self.candidate_lists = {}
+
+    def candidate_list(self, size:int):
+        # para cada vertice, as arestas para os size vizinhos mais proximos
+        # a lista é calculada uma unica vez para cada tamanho
+        if size not in self.candidate_lists:
+            self.candidate_lists[size] = {vertex:heapq.nsmallest(size, arris_list, key=lambda arris: arris.distance) for vertex, arris_list in self.outgoing.items()}
+
+        return self.candidate_lists[size]
+
+    def evaporate(self, evaporation_constant:float):
+        for arris in self.arris_list:
+            arris.pheromone *= (1 - evaporation_constant)
+
+    def deposit(self, pheromone_addition:dict):
+        # pheromone_addition é indexado por (origem, destino)
+        for key, pheromone in pheromone_addition.items():
+            arris = self.arris_dict.get(key)
+            if arris is not None:
+                arris.pheromone += pheromone
+
     def update_pheromone(self, 
                          generation:list, 
                          update_constant:float, 
                          evaporation_constant:float):
-        
+
+        # cada formiga percorre seu caminho uma unica vez, acumulando o feromonio por aresta
+        pheromone_addition = {}
+
+        for ant in generation:
+            pheromone = update_constant / ant.calculate_distance()
+            path = ant.visited_vertex
+
+            for i in range(len(path)):
+                vertex = path[i]
+                next_vertex = path[(i + 1) % len(path)]
+
+                # deposita nas duas direções, independente do sentido em que a formiga passou
+                pheromone_addition[(vertex, next_vertex)] = pheromone_addition.get((vertex, next_vertex), 0) + pheromone
+                pheromone_addition[(next_vertex, vertex)] = pheromone_addition.get((next_vertex, vertex), 0) + pheromone
+
+        self.evaporate(evaporation_constant)
+        self.deposit(pheromone_addition)
+
+    def deposit_tour(self, ant, pheromone:float):
+        # deposita o feromonio apenas nas arestas do caminho de uma formiga
+        path = ant.visited_vertex
+        pheromone_addition = {}
+        for i in range(len(path)):
+            vertex = path[i]
+            next_vertex = path[(i + 1) % len(path)]
+            pheromone_addition[(vertex, next_vertex)] = pheromone_addition.get((vertex, next_vertex), 0) + pheromone
+            pheromone_addition[(next_vertex, vertex)] = pheromone_addition.get((next_vertex, vertex), 0) + pheromone
+        self.deposit(pheromone_addition)
+
+    def reinforce_tour(self, ant, evaporation_constant:float, pheromone:float):
+        # evaporação e deposito apenas nas arestas do caminho da formiga, as demais arestas não mudam
+        path = ant.visited_vertex
+        for i in range(len(path)):
+            for key in ((path[i], path[(i + 1) % len(path)]), (path[(i + 1) % len(path)], path[i])):
+                arris = self.arris_dict.get(key)
+                if arris is not None:
+                    arris.pheromone = (1 - evaporation_constant)*arris.pheromone + evaporation_constant*pheromone
+
+    def local_update(self, origin, destination, local_evaporation:float, initial_pheromone:float):
+        # atualização local, feita enquanto a formiga se move, aproxima o feromonio da aresta do feromonio inicial
+        for key in ((origin, destination), (destination, origin)):
+            arris = self.arris_dict.get(key)
+            if arris is not None:
+                arris.pheromone = (1 - local_evaporation)*arris.pheromone + local_evaporation*initial_pheromone
+
+    def clamp_pheromone(self, pheromone_min:float, pheromone_max:float):
         for arris in self.arris_list:
-            arris.update_pheromone(generation, update_constant, evaporation_constant)
+            arris.pheromone = min(max(arris.pheromone, pheromone_min), pheromone_max)
+
+    def reset_pheromone(self, pheromone:float):
+        for arris in self.arris_list:
+            arris.pheromone = pheromone
+
+    def get_pheromone(self):
+        # feromonio de cada aresta, na ordem da arris_list
+        return np.array([arris.pheromone for arris in self.arris_list], dtype=np.float64)
+
+    def set_pheromone(self, pheromone:np.ndarray):
+        for arris, value in zip(self.arris_list, pheromone.tolist()):
+            arris.pheromone = value
+
+    def own_distance_dict(self):
+        # o distance_dict é do usuario; antes da primeira alteração ele é copiado, uma unica vez, para não modificar o original
+        if not self.owns_distance_dict:
+            self.distance_dict = {origin:dict(row) for origin, row in self.distance_dict.items()}
+            self.owns_distance_dict = True
+
+    def update_distances(self, changed_edges:dict, repair:float=0.5):
+        # altera a distancia das arestas em changed_edges, indexado por (origem, destino)
+        # o feromonio dessas arestas (nas duas direções) é aproximado do inicial em repair (0 mantém, 1 reinicia)
+        self.own_distance_dict()
+        for (origin, destination), distance in changed_edges.items():
+            arris = self.arris_dict[(origin, destination)]
+            arris.distance = distance
+            # a avaliação guardada não considera a distancia, precisa ser descartada
+            arris.evaluation_key = None
+            self.distance_dict[origin][destination] = distance
+
+        # cada aresta é reparada uma unica vez, mesmo que as duas direções tenham mudado
+        for key in {key for origin, destination in changed_edges for key in ((origin, destination), (destination, origin))}:
+            arris = self.arris_dict[key]
+            arris.pheromone = (1 - repair)*arris.pheromone + repair*self.initial_pheromone
+            arris.evaluation_key = None
+
+        # apenas as listas de candidatos dos vertices de origem alterados são recalculadas
+        origins = {origin for origin, destination in changed_edges}
+        for size, candidate_lists in self.candidate_lists.items():
+            for origin in origins:
+                candidate_lists[origin] = heapq.nsmallest(size, self.outgoing[origin], key=lambda arris: arris.distance)
+
+    def add_vertices(self, added_vertices:dict):
+        # acrescenta vertices ao grafo; added_vertices tem, para cada novo vertice, um dict com a distancia
+        # para cada vertice existente e para os outros novos, usada nas duas direções
+        # o feromonio das novas arestas é o feromonio medio das arestas existentes, assim elas competem com as demais
+        pheromone = float(np.mean([arris.pheromone for arris in self.arris_list])) if self.arris_list else self.initial_pheromone
+        self.own_distance_dict()
+        self.vertex_list = self.vertex_list + list(added_vertices)
+
+        for vertex, distances in added_vertices.items():
+            self.distance_dict.setdefault(vertex, {})
+            self.outgoing.setdefault(vertex, [])
+            for other in self.vertex_list:
+                if other == vertex or (vertex, other) in self.arris_dict:
+                    continue
+                distance = distances[other] if other in distances else added_vertices[other][vertex]
+                for origin, destination in ((vertex, other), (other, vertex)):
+                    arris = Arris(origin=origin, destination=destination, distance=distance, pheromone=pheromone)
+                    self.arris_list.append(arris)
+                    self.arris_dict[(origin, destination)] = arris
+                    self.outgoing.setdefault(origin, []).append(arris)
+                    self.distance_dict.setdefault(origin, {})[destination] = distance
+
+        self.vertex_index = {vertex:i for i, vertex in enumerate(self.vertex_list)}
+        self.candidate_lists = {}
+
+    def remove_vertices(self, removed_vertices:list):
+        # remove os vertices e todas as arestas que chegam ou saem deles
+        removed = set(removed_vertices)
+        self.vertex_list = [vertex for vertex in self.vertex_list if vertex not in removed]
+        self.vertex_index = {vertex:i for i, vertex in enumerate(self.vertex_list)}
+        self.arris_list = [arris for arris in self.arris_list if arris.origin not in removed and arris.destination not in removed]
+        self.arris_dict = {(arris.origin, arris.destination):arris for arris in self.arris_list}
+        self.outgoing = {vertex:[] for vertex in self.vertex_list}
+        for arris in self.arris_list:
+            self.outgoing[arris.origin].append(arris)
+        self.candidate_lists = {}
+
+class MatrixGraph():
+    def __init__(self, 
+                 vertex_list:list, 
+                 distance_dict:dict=None, 
+                 initial_pheromone:float=0.1, 
+                 distance_matrix:np.ndarray=None, 
+                 coordinates:np.ndarray=None):
+        self.vertex_list = list(vertex_list)
+        self.vertex_index = {vertex:i for i, vertex in enumerate(self.vertex_list)}
+        self.distance_dict = distance_dict
+        self.initial_pheromone = initial_pheromone
+        self.coordinates = None if coordinates is None else np.asarray(coordinates, dtype=np.float64)
+
+        number_of_vertex = len(self.vertex_list)
+
+        # a distancia pode ser dada diretamente como matriz, calculada a partir das coordenadas
+        # ou montada a partir do dicionario de distancias, como no CompleteGraph
+        if distance_matrix is not None:
+            self.distance_matrix = np.asarray(distance_matrix, dtype=np.float64)
+        elif self.coordinates is not None:
+            # soma por dimensão para não criar um array (n, n, d) intermediario
+            self.distance_matrix = np.zeros((number_of_vertex, number_of_vertex), dtype=np.float64)
+            for axis in range(self.coordinates.shape[1]):
+                difference = np.subtract.outer(self.coordinates[:, axis], self.coordinates[:, axis])
+                np.square(difference, out=difference)
+                self.distance_matrix += difference
+            np.sqrt(self.distance_matrix, out=self.distance_matrix)
+        elif distance_dict is not None:
+            self.distance_matrix = np.zeros((number_of_vertex, number_of_vertex), dtype=np.float64)
+            for i, origin in enumerate(self.vertex_list):
+                for j, destination in enumerate(self.vertex_list):
+                    if origin != destination:
+                        self.distance_matrix[i, j] = distance_dict[origin][destination]
+        else:
+            raise Exception("Error: distance_dict, distance_matrix or coordinates must be given")
+
+        if self.distance_matrix.shape != (number_of_vertex, number_of_vertex):
+            raise Exception("Error: The distance matrix must be square with one row per vertex")
+
+        # mesma interface do SparseGraph, distances[origem, destino]
+        self.distances = self.distance_matrix
+
+        # uma distance_matrix float64 é usada sem copia e pode ser compartilhada com o usuario ou outras colonias,
+        # então é copiada antes da primeira alteração (update_distances)
+        self.owns_distances = distance_matrix is None
+
+        # o feromonio inicial de cada aresta é o mesmo, a diagonal é zerada pois não existe aresta de um vertice para ele mesmo
+        self.pheromone_matrix = np.full((number_of_vertex, number_of_vertex), self.initial_pheromone, dtype=np.float64)
+        np.fill_diagonal(self.pheromone_matrix, 0)
+
+        # η^β só depende da distancia, então é recalculado apenas quando o expoente muda
+        self.heuristic_matrix = None
+        self.heuristic_expoent = None
+
+        # τ^α·η^β muda a cada atualização de feromonio, é guardado até a proxima atualização
+        self.weight_matrix = None
+        self.weight_expoents = None
+
+        self.candidate_lists = {}
+
+    def candidate_list(self, size:int):
+        # matriz (n, size) com os indices dos size vizinhos mais proximos de cada vertice, do mais proximo para o mais distante
+        # a lista é calculada uma unica vez para cada tamanho
+        number_of_vertex = len(self.vertex_list)
+        size = min(size, number_of_vertex - 1)
+
+        if size not in self.candidate_lists:
+            cKDTree = kd_tree() if self.coordinates is not None else None
+            if cKDTree is not None:
+                # com as coordenadas, usa-se um indice espacial; o primeiro vizinho é o proprio vertice
+                _, neighbours = cKDTree(self.coordinates).query(self.coordinates, k=size + 1)
+                candidates = np.empty((number_of_vertex, size), dtype=np.int64)
+                for i in range(number_of_vertex):
+                    row = neighbours[i][neighbours[i] != i]
+                    candidates[i] = row[:size]
+            else:
+                # sem coordenadas, ordena-se parcialmente cada linha da matriz de distancias
+                candidates = self.nearest_neighbours(np.arange(number_of_vertex), size)
+
+            self.candidate_lists[size] = candidates
+
+        return self.candidate_lists[size]
+
+    def nearest_neighbours(self, rows:np.ndarray, size:int):
+        # os size vizinhos mais proximos dos vertices em rows, pela matriz de distancias, do mais proximo para o mais distante
+        distance_matrix = self.distance_matrix[rows]
+        distance_matrix[np.arange(len(rows)), rows] = np.inf
+        candidates = np.argpartition(distance_matrix, size - 1, axis=1)[:, :size]
+        order = np.argsort(np.take_along_axis(distance_matrix, candidates, axis=1), axis=1)
+        return np.take_along_axis(candidates, order, axis=1)
+
+    def heuristic(self, distance_expoent:float):
+        if self.heuristic_matrix is None or self.heuristic_expoent != distance_expoent:
+            with np.errstate(divide='ignore'):
+                heuristic_matrix = 1/self.distance_matrix
+            np.fill_diagonal(heuristic_matrix, 0)
+            if distance_expoent != 1:
+                np.power(heuristic_matrix, distance_expoent, out=heuristic_matrix)
+            self.heuristic_matrix = heuristic_matrix
+            self.heuristic_expoent = distance_expoent
+            self.weight_matrix = None
+
+        return self.heuristic_matrix
+
+    def weights(self, distance_expoent:float, pheromone_expoent:float):
+        # matriz de avaliação das arestas, equivalente ao Arris.evaluate_arris de cada aresta
+        heuristic_matrix = self.heuristic(distance_expoent)
+
+        if self.weight_matrix is None or self.weight_expoents != (distance_expoent, pheromone_expoent):
+            if pheromone_expoent != 1:
+                weight_matrix = np.power(self.pheromone_matrix, pheromone_expoent)
+                weight_matrix *= heuristic_matrix
+            else:
+                weight_matrix = self.pheromone_matrix * heuristic_matrix
+            self.weight_matrix = weight_matrix
+            self.weight_expoents = (distance_expoent, pheromone_expoent)
+
+        return self.weight_matrix
+
+    def tour_length(self, tour:np.ndarray):
+        # distancia do caminho fechado, voltando para o ponto de partida
+        return float(self.distance_matrix[tour, np.roll(tour, -1)].sum())
+
+    def update_pheromone(self, 
+                         generation:list, 
+                         update_constant:float, 
+                         evaporation_constant:float):
+
+        if len(generation) == 0:
+            self.evaporate(evaporation_constant)
+            return
+
+        # as arestas de todas as formigas são concatenadas e depositadas de uma vez
+        origin = np.concatenate([ant.tour for ant in generation])
+        destination = np.concatenate([np.roll(ant.tour, -1) for ant in generation])
+        pheromone = np.concatenate([np.full(len(ant.tour), update_constant / ant.calculate_distance()) for ant in generation])
+
+        self.evaporate(evaporation_constant)
+        self.deposit(origin, destination, pheromone)
+
+    def evaporate(self, evaporation_constant:float):
+        self.pheromone_matrix *= (1 - evaporation_constant)
+        self.weight_matrix = None
+
+    def deposit(self, 
+                origin:np.ndarray, 
+                destination:np.ndarray, 
+                pheromone:np.ndarray):
+        # deposita nas duas direções, o grafo é simetrico
+        np.add.at(self.pheromone_matrix, (origin, destination), pheromone)
+        np.add.at(self.pheromone_matrix, (destination, origin), pheromone)
+        self.weight_matrix = None
+
+    def deposit_tour(self, ant, pheromone:float):
+        # deposita o feromonio apenas nas arestas do caminho de uma formiga
+        self.deposit(ant.tour, np.roll(ant.tour, -1), np.full(len(ant.tour), pheromone))
+
+    def reinforce_tour(self, ant, evaporation_constant:float, pheromone:float):
+        # evaporação e deposito apenas nas arestas do caminho da formiga, as demais arestas não mudam
+        origin = ant.tour
+        destination = np.roll(ant.tour, -1)
+        self.pheromone_matrix[origin, destination] = (1 - evaporation_constant)*self.pheromone_matrix[origin, destination] + evaporation_constant*pheromone
+        self.pheromone_matrix[destination, origin] = self.pheromone_matrix[origin, destination]
+        self.refresh_weights(origin, destination)
+
+    def local_update(self, origin:int, destination:int, local_evaporation:float, initial_pheromone:float):
+        # atualização local, feita enquanto a formiga se move, aproxima o feromonio da aresta do feromonio inicial
+        pheromone = (1 - local_evaporation)*self.pheromone_matrix[origin, destination] + local_evaporation*initial_pheromone
+        self.pheromone_matrix[origin, destination] = pheromone
+        self.pheromone_matrix[destination, origin] = pheromone
+        self.refresh_weights(origin, destination)
+
+    def refresh_weights(self, origin, destination):
+        # recalcula apenas as posições alteradas da matriz de avaliação, em vez de descartá-la
+        if self.weight_matrix is not None:
+            distance_expoent, pheromone_expoent = self.weight_expoents
+            for row, column in ((origin, destination), (destination, origin)):
+                self.weight_matrix[row, column] = self.pheromone_matrix[row, column]**pheromone_expoent * self.heuristic_matrix[row, column]
+
+    def clamp_pheromone(self, pheromone_min:float, pheromone_max:float):
+        np.clip(self.pheromone_matrix, pheromone_min, pheromone_max, out=self.pheromone_matrix)
+        np.fill_diagonal(self.pheromone_matrix, 0)
+        self.weight_matrix = None
+
+    def reset_pheromone(self, pheromone:float):
+        self.pheromone_matrix.fill(pheromone)
+        np.fill_diagonal(self.pheromone_matrix, 0)
+        self.weight_matrix = None
+
+    def get_pheromone(self):
+        return self.pheromone_matrix.copy()
+
+    def set_pheromone(self, pheromone:np.ndarray):
+        self.pheromone_matrix[...] = pheromone
+        self.weight_matrix = None
+
+    def refresh_heuristic(self, origin:np.ndarray, destination:np.ndarray):
+        # recalcula η^β e τ^α·η^β apenas nas posições (origem, destino) dadas, por exemplo após uma mudança de distancia
+        if self.heuristic_matrix is not None:
+            with np.errstate(divide='ignore'):
+                heuristic = (1/self.distance_matrix[origin, destination])**self.heuristic_expoent
+            self.heuristic_matrix[origin, destination] = np.where(origin == destination, 0, heuristic)
+        if self.weight_matrix is not None:
+            distance_expoent, pheromone_expoent = self.weight_expoents
+            self.weight_matrix[origin, destination] = self.pheromone_matrix[origin, destination]**pheromone_expoent * self.heuristic_matrix[origin, destination]
+
+    def refresh_candidates(self, rows:np.ndarray):
+        # recalcula apenas as linhas dadas das listas de candidatos já calculadas
+        if len(rows) == 0:
+            return
+        for size in list(self.candidate_lists):
+            if size > len(self.vertex_list) - 1:
+                del self.candidate_lists[size]
+            else:
+                self.candidate_lists[size][rows] = self.nearest_neighbours(rows, size)
+
+    def update_distances(self, 
+                         origin:np.ndarray, 
+                         destination:np.ndarray, 
+                         distance:np.ndarray, 
+                         repair:float=0.5):
+        # altera a distancia das arestas (origem, destino), dadas por indices, sem recriar o grafo
+        # o feromonio dessas arestas (nas duas direções) é aproximado do inicial em repair (0 mantém, 1 reinicia)
+        # e apenas as posições alteradas de η^β e τ^α·η^β e as linhas alteradas das listas de candidatos são recalculadas
+        origin = np.asarray(origin, dtype=np.int64)
+        destination = np.asarray(destination, dtype=np.int64)
+        if not self.owns_distances:
+            self.distance_matrix = self.distance_matrix.copy()
+            self.distances = self.distance_matrix
+            self.owns_distances = True
+        self.distance_matrix[origin, destination] = distance
+
+        # as distancias deixam de corresponder as coordenadas, as proximas listas de candidatos usam a matriz
+        self.coordinates = None
+
+        # cada aresta é reparada uma unica vez, mesmo que as duas direções tenham mudado
+        row, column = np.unique(np.stack([np.concatenate([origin, destination]), np.concatenate([destination, origin])]), axis=1)
+        self.pheromone_matrix[row, column] = (1 - repair)*self.pheromone_matrix[row, column] + repair*self.initial_pheromone
+        self.refresh_heuristic(row, column)
+        self.refresh_candidates(np.unique(origin))
+
+    def add_vertices(self, vertices:list, distances:np.ndarray):
+        # acrescenta vertices ao grafo; distances é uma matriz (novos vertices, todos os vertices) com a distancia de cada
+        # novo vertice para os vertices existentes e para os novos, nessa ordem, e é usada também no sentido inverso
+        # o feromonio das novas arestas é o feromonio medio das arestas existentes, assim elas competem com as demais
+        number_of_vertex = len(self.vertex_list)
+        total = number_of_vertex + len(vertices)
+        distances = np.asarray(distances, dtype=np.float64)
+        if distances.shape != (len(vertices), total):
+            raise Exception("Error: The distances must have one row per new vertex and one column per vertex")
+
+        mask = ~np.eye(number_of_vertex, dtype=bool)
+        pheromone = self.pheromone_matrix[mask].mean() if number_of_vertex > 1 else self.initial_pheromone
+
+        def grow(matrix, fill):
+            grown = np.full((total, total), fill, dtype=np.float64)
+            grown[:number_of_vertex, :number_of_vertex] = matrix
+            return grown
+
+        self.distance_matrix = grow(self.distance_matrix, 0)
+        self.distance_matrix[number_of_vertex:, :] = distances
+        self.distance_matrix[:, number_of_vertex:] = distances.T
+        self.distances = self.distance_matrix
+        self.owns_distances = True
+        self.coordinates = None
+
+        self.pheromone_matrix = grow(self.pheromone_matrix, pheromone)
+        np.fill_diagonal(self.pheromone_matrix, 0)
+
+        self.vertex_list = self.vertex_list + list(vertices)
+        self.vertex_index = {vertex:i for i, vertex in enumerate(self.vertex_list)}
+
+        # apenas as novas linhas e colunas de η^β e τ^α·η^β são calculadas
+        new = np.arange(number_of_vertex, total)
+        rows, columns = np.meshgrid(new, np.arange(total), indexing='ij')
+        rows, columns = np.concatenate([rows.ravel(), columns.ravel()]), np.concatenate([columns.ravel(), rows.ravel()])
+        if self.heuristic_matrix is not None:
+            self.heuristic_matrix = grow(self.heuristic_matrix, 0)
+        if self.weight_matrix is not None:
+            self.weight_matrix = grow(self.weight_matrix, 0)
+        self.refresh_heuristic(rows, columns)
+
+        # as listas de candidatos mudam nos novos vertices e nos vertices que passam a ter um novo vertice entre os mais proximos
+        affected = [new]
+        for size, candidates in list(self.candidate_lists.items()):
+            farthest = self.distance_matrix[np.arange(number_of_vertex), candidates[:, -1]]
+            affected.append(np.flatnonzero((distances[:, :number_of_vertex].T < farthest[:, np.newaxis]).any(axis=1)))
+            self.candidate_lists[size] = np.concatenate([candidates, np.zeros((len(vertices), size), dtype=candidates.dtype)])
+        self.refresh_candidates(np.unique(np.concatenate(affected)))
+
+    def remove_vertices(self, indices:list):
+        # remove os vertices dados por indices, com suas linhas e colunas em todas as matrizes
+        number_of_vertex = len(self.vertex_list)
+        keep = np.ones(number_of_vertex, dtype=bool)
+        keep[np.asarray(indices, dtype=np.int64)] = False
+
+        # novo indice de cada vertice, -1 para os removidos
+        new_index = np.full(number_of_vertex, -1, dtype=np.int64)
+        new_index[keep] = np.arange(keep.sum())
+
+        self.distance_matrix = self.distance_matrix[np.ix_(keep, keep)]
+        self.distances = self.distance_matrix
+        self.owns_distances = True
+        self.pheromone_matrix = self.pheromone_matrix[np.ix_(keep, keep)]
+        if self.heuristic_matrix is not None:
+            self.heuristic_matrix = self.heuristic_matrix[np.ix_(keep, keep)]
+        if self.weight_matrix is not None:
+            self.weight_matrix = self.weight_matrix[np.ix_(keep, keep)]
+        if self.coordinates is not None:
+            self.coordinates = self.coordinates[keep]
+
+        self.vertex_list = [vertex for vertex, kept in zip(self.vertex_list, keep) if kept]
+        self.vertex_index = {vertex:i for i, vertex in enumerate(self.vertex_list)}
+
+        # só são recalculadas as linhas que tinham um vertice removido entre os candidatos
+        for size, candidates in list(self.candidate_lists.items()):
+            self.candidate_lists[size] = new_index[candidates[keep]]
+        affected = [np.zeros(0, dtype=np.int64)] + [np.flatnonzero((candidates < 0).any(axis=1)) for candidates in self.candidate_lists.values()]
+        self.refresh_candidates(np.unique(np.concatenate(affected)))
+
+def euclidean_metric(origin:np.ndarray, destination:np.ndarray):
+    # distancia entre pares de pontos, um ponto por linha
+    return np.sqrt(np.square(origin - destination).sum(axis=-1))
+
+def haversine_metric(origin:np.ndarray, destination:np.ndarray):
+    # distancia em km sobre a superficie da Terra, com as coordenadas em graus (latitude, longitude)
+    latitude_1, longitude_1 = np.radians(origin[..., 0]), np.radians(origin[..., 1])
+    latitude_2, longitude_2 = np.radians(destination[..., 0]), np.radians(destination[..., 1])
+    a = np.sin((latitude_2 - latitude_1)/2)**2 + np.cos(latitude_1)*np.cos(latitude_2)*np.sin((longitude_2 - longitude_1)/2)**2
+    return 2*6371.0*np.arcsin(np.sqrt(np.minimum(a, 1)))
+
+METRICS = {'euclidean':euclidean_metric, 'haversine':haversine_metric}
+
+def unit_sphere(coordinates:np.ndarray):
+    # pontos (latitude, longitude) em graus levados à esfera de raio 1; a distancia em linha reta entre eles
+    # cresce junto com a distancia sobre a superficie, então os vizinhos mais proximos são os mesmos
+    latitude, longitude = np.radians(coordinates[:, 0]), np.radians(coordinates[:, 1])
+    return np.stack([np.cos(latitude)*np.cos(longitude), np.cos(latitude)*np.sin(longitude), np.sin(latitude)], axis=1)
+
+# pontos usados no indice espacial de cada metrica
+KD_TREE_POINTS = {'euclidean':lambda coordinates: coordinates, 'haversine':unit_sphere}
+
+class LazyDistance():
+    # distancias calculadas sob demanda e guardadas em um cache LRU limitado, acessadas como uma matriz: distance[origem, destino]
+    def __init__(self, 
+                 function, 
+                 cache_size:int=2**20):
+        self.lookup = functools.lru_cache(maxsize=cache_size)(function)
+
+    def __getitem__(self, key:tuple):
+        origin, destination = int(key[0]), int(key[1])
+        # o grafo é simetrico, a mesma entrada do cache serve para as duas direções
+        if origin > destination:
+            origin, destination = destination, origin
+        return self.lookup(origin, destination)
+
+class SparseGraph():
+    def __init__(self, 
+                 vertex_list:list, 
+                 coordinates:np.ndarray=None, 
+                 adjacency:tuple=None, 
+                 initial_pheromone:float=0.1, 
+                 number_of_neighbours:int=10, 
+                 metric:str='euclidean', 
+                 distance_cache_size:int=2**20):
+        
+        # grafo em que o feromonio só existe nas arestas guardadas, em formato CSR (indptr, indices, distancias por aresta)
+        # com coordinates, as arestas guardadas são as dos number_of_neighbours vizinhos mais proximos de cada vertice
+        # e as demais distancias são calculadas sob demanda
+        # com adjacency = (indptr, indices, distances), apenas as arestas dadas existem
+        self.vertex_list = list(vertex_list)
+        self.vertex_index = {vertex:i for i, vertex in enumerate(self.vertex_list)}
+        self.initial_pheromone = initial_pheromone
+        self.coordinates = None if coordinates is None else np.asarray(coordinates, dtype=np.float64)
+
+        number_of_vertex = len(self.vertex_list)
+
+        if metric not in METRICS:
+            raise Exception("Error: Invalid metric")
+        self.metric = METRICS[metric]
+
+        if adjacency is not None:
+            indptr, indices, distances = (np.asarray(array) for array in adjacency)
+            origin = np.repeat(np.arange(number_of_vertex), np.diff(indptr))
+            self.neighbours = None
+        elif self.coordinates is not None:
+            self.neighbours = self.nearest_neighbours(min(number_of_neighbours, number_of_vertex - 1), metric)
+            # as arestas são guardadas nas duas direções, assim o deposito é simetrico
+            origin = np.repeat(np.arange(number_of_vertex), self.neighbours.shape[1])
+            indices = self.neighbours.ravel()
+            origin, indices = np.concatenate([origin, indices]), np.concatenate([indices, origin])
+            distances = self.metric(self.coordinates[origin], self.coordinates[indices])
+        else:
+            raise Exception("Error: coordinates or adjacency must be given")
+
+        # cada aresta tem uma chave origem*n + destino; ordenando as chaves, as arestas ficam agrupadas por origem (formato CSR)
+        # e uma aresta é encontrada por busca binaria
+        keys, unique_index = np.unique(origin.astype(np.int64)*number_of_vertex + np.asarray(indices, dtype=np.int64), return_index=True)
+        self.edge_keys = keys
+        self.indices = (keys % number_of_vertex).astype(np.int64)
+        self.indptr = np.searchsorted(keys, np.arange(number_of_vertex + 1, dtype=np.int64)*number_of_vertex)
+        self.edge_distance = np.asarray(distances, dtype=np.float64)[unique_index]
+
+        self.pheromone = np.full(len(self.indices), self.initial_pheromone, dtype=np.float64)
+
+        # distancias entre quaisquer dois vertices, calculadas sob demanda (usadas por exemplo pela busca local)
+        self.distances = LazyDistance(self.compute_distance, distance_cache_size)
+
+        self.heuristic_array = None
+        self.heuristic_expoent = None
+        self.weight_array = None
+        self.weight_expoents = None
+
+        # listas de candidatos das arestas dadas em adjacency, calculadas uma unica vez para cada tamanho
+        self.candidate_lists = {}
+
+    def nearest_neighbours(self, size:int, metric:str):
+        number_of_vertex = len(self.coordinates)
+
+        cKDTree = kd_tree()
+        if cKDTree is not None:
+            # o indice espacial só encontra os vizinhos, as distancias das arestas são calculadas depois com a propria metrica
+            points = KD_TREE_POINTS[metric](self.coordinates)
+            _, neighbours = cKDTree(points).query(points, k=size + 1)
+        else:
+            # sem indice espacial, as distancias são calculadas em blocos de linhas, sem montar a matriz inteira
+            neighbours = np.empty((number_of_vertex, size + 1), dtype=np.int64)
+            block = max(1, 2**24 // max(number_of_vertex, 1))
+            for start in range(0, number_of_vertex, block):
+                rows = np.arange(start, min(start + block, number_of_vertex))
+                distance = self.metric(self.coordinates[rows][:, np.newaxis, :], self.coordinates[np.newaxis, :, :])
+                distance[np.arange(len(rows)), rows] = -1
+                candidates = np.argpartition(distance, size, axis=1)[:, :size + 1]
+                order = np.argsort(np.take_along_axis(distance, candidates, axis=1), axis=1)
+                neighbours[rows] = np.take_along_axis(candidates, order, axis=1)
+
+        # retira o proprio vertice de cada linha
+        result = np.empty((number_of_vertex, size), dtype=np.int64)
+        for i in range(number_of_vertex):
+            row = neighbours[i][neighbours[i] != i]
+            result[i] = row[:size]
+        return result
+
+    def compute_distance(self, origin:int, destination:int):
+        if self.coordinates is not None:
+            return float(self.metric(self.coordinates[origin], self.coordinates[destination]))
+        position = self.edge_position(np.array([origin]), np.array([destination]))[0]
+        return float(self.edge_distance[position]) if position >= 0 else np.inf
+
+    def edge_position(self, origin:np.ndarray, destination:np.ndarray):
+        # posição de cada aresta (origem, destino) nos arrays de arestas, -1 se a aresta não é guardada
+        keys = np.asarray(origin, dtype=np.int64)*len(self.vertex_list) + np.asarray(destination, dtype=np.int64)
+        position = np.searchsorted(self.edge_keys, keys)
+        position[position == len(self.edge_keys)] = 0
+        return np.where(self.edge_keys[position] == keys, position, -1)
+
+    def candidate_list(self, size:int):
+        # os size vizinhos mais proximos de cada vertice entre as arestas guardadas, do mais proximo para o mais distante
+        if self.neighbours is not None:
+            return self.neighbours[:, :size]
+        if size not in self.candidate_lists:
+            candidates = []
+            for i in range(len(self.vertex_list)):
+                start, end = self.indptr[i], self.indptr[i + 1]
+                order = np.argsort(self.edge_distance[start:end], kind='stable')[:size]
+                candidates.append(self.indices[start:end][order].tolist())
+            self.candidate_lists[size] = candidates
+        return self.candidate_lists[size]
+
+    def heuristic(self, distance_expoent:float):
+        if self.heuristic_array is None or self.heuristic_expoent != distance_expoent:
+            with np.errstate(divide='ignore'):
+                self.heuristic_array = (1/self.edge_distance)**distance_expoent
+            self.heuristic_expoent = distance_expoent
+            self.weight_array = None
+        return self.heuristic_array
+
+    def weights(self, distance_expoent:float, pheromone_expoent:float):
+        # avaliação τ^α·η^β de cada aresta guardada
+        heuristic_array = self.heuristic(distance_expoent)
+        if self.weight_array is None or self.weight_expoents != (distance_expoent, pheromone_expoent):
+            self.weight_array = self.pheromone**pheromone_expoent * heuristic_array
+            self.weight_expoents = (distance_expoent, pheromone_expoent)
+        return self.weight_array
+
+    def fallback_weights(self, origin:int, destinations:np.ndarray, distance_expoent:float, pheromone_expoent:float):
+        # avaliação das arestas não guardadas, que têm sempre o feromonio inicial; só existe com coordenadas
+        distance = self.metric(self.coordinates[origin], self.coordinates[destinations])
+        with np.errstate(divide='ignore'):
+            return self.initial_pheromone**pheromone_expoent * (1/distance)**distance_expoent
+
+    def tour_length(self, tour:np.ndarray):
+        next_tour = np.roll(tour, -1)
+        if self.coordinates is not None:
+            return float(self.metric(self.coordinates[tour], self.coordinates[next_tour]).sum())
+        position = self.edge_position(tour, next_tour)
+        if (position < 0).any():
+            return np.inf
+        return float(self.edge_distance[position].sum())
+
+    def evaporate(self, evaporation_constant:float):
+        self.pheromone *= (1 - evaporation_constant)
+        self.weight_array = None
+
+    def deposit(self, 
+                origin:np.ndarray, 
+                destination:np.ndarray, 
+                pheromone:np.ndarray):
+        # deposita nas duas direções; arestas que não são guardadas não recebem feromonio
+        for row, column in ((origin, destination), (destination, origin)):
+            position = self.edge_position(row, column)
+            found = position >= 0
+            np.add.at(self.pheromone, position[found], np.broadcast_to(pheromone, position.shape)[found])
+        self.weight_array = None
+
+    def update_pheromone(self, 
+                         generation:list, 
+                         update_constant:float, 
+                         evaporation_constant:float):
+        self.evaporate(evaporation_constant)
+
+        # formigas que não completaram o caminho (sem aresta disponivel) não depositam
+        generation = [ant for ant in generation if np.isfinite(ant.calculate_distance())]
+        if len(generation) == 0:
+            return
+
+        origin = np.concatenate([ant.tour for ant in generation])
+        destination = np.concatenate([np.roll(ant.tour, -1) for ant in generation])
+        pheromone = np.concatenate([np.full(len(ant.tour), update_constant / ant.calculate_distance()) for ant in generation])
+        self.deposit(origin, destination, pheromone)
+
+    def deposit_tour(self, ant, pheromone:float):
+        if np.isfinite(ant.calculate_distance()):
+            self.deposit(ant.tour, np.roll(ant.tour, -1), np.full(len(ant.tour), pheromone))
+
+    def reinforce_tour(self, ant, evaporation_constant:float, pheromone:float):
+        if not np.isfinite(ant.calculate_distance()):
+            return
+        origin = ant.tour
+        destination = np.roll(ant.tour, -1)
+        position = np.concatenate([self.edge_position(origin, destination), self.edge_position(destination, origin)])
+        position = np.unique(position[position >= 0])
+        self.pheromone[position] = (1 - evaporation_constant)*self.pheromone[position] + evaporation_constant*pheromone
+        self.refresh_weights(position)
+
+    def local_update(self, origin:int, destination:int, local_evaporation:float, initial_pheromone:float):
+        position = self.edge_position(np.array([origin, destination]), np.array([destination, origin]))
+        position = position[position >= 0]
+        self.pheromone[position] = (1 - local_evaporation)*self.pheromone[position] + local_evaporation*initial_pheromone
+        self.refresh_weights(position)
+
+    def refresh_weights(self, position:np.ndarray):
+        if self.weight_array is not None:
+            distance_expoent, pheromone_expoent = self.weight_expoents
+            self.weight_array[position] = self.pheromone[position]**pheromone_expoent * self.heuristic_array[position]
+
+    def clamp_pheromone(self, pheromone_min:float, pheromone_max:float):
+        np.clip(self.pheromone, pheromone_min, pheromone_max, out=self.pheromone)
+        self.weight_array = None
+
+    def reset_pheromone(self, pheromone:float):
+        self.pheromone.fill(pheromone)
+        self.weight_array = None
+
+    def get_pheromone(self):
+        # feromonio de cada aresta guardada, na ordem de indices
+        return self.pheromone.copy()
+
+    def set_pheromone(self, pheromone:np.ndarray):
+        self.pheromone[...] = pheromone
+        self.weight_array = None
 
 class Ant():
     def __init__ (self, 
@@ -129,32 +908,62 @@ class Ant():
                   graph:CompleteGraph, 
                   method_of_selection:str, 
                   distance_expoent:float, 
-                  pheromone_expoent:float):
+                  pheromone_expoent:float, 
+                  candidate_list_size:int=None, 
+                  rng:RandomStream=None, 
+                  exploitation:float=0, 
+                  local_update=None):
         
         self.current_vertex = current_vertex
         self.visited_vertex = []
         self.visited_vertex.append(current_vertex)
+        self.visited_set = {current_vertex}
         self.graph = graph
         self.method_of_selection = method_of_selection
         self.distance_expoent = distance_expoent
         self.pheromone_expoent = pheromone_expoent
+        self.candidate_list_size = candidate_list_size
+        self.rng = rng if rng is not None else RandomStream()
+
+        # probabilidade de escolher diretamente a melhor aresta, sem sorteio (regra pseudo-aleatoria do Ant Colony System)
+        self.exploitation = exploitation
+        # função chamada a cada aresta percorrida, (grafo, origem, destino), usada pela atualização local do Ant Colony System
+        self.local_update = local_update
 
     def move(self):
         current_vertex = self.current_vertex
         possible_destinations = []
-        for arris in self.graph.arris_list:
-            if arris.origin == current_vertex and arris.destination not in self.visited_vertex:
-                possible_destinations.append(arris)
+
+        # com a lista de candidatos, a formiga escolhe apenas entre os vizinhos mais proximos ainda não visitados
+        if self.candidate_list_size is not None:
+            for arris in self.graph.candidate_list(self.candidate_list_size)[current_vertex]:
+                if arris.destination not in self.visited_set:
+                    possible_destinations.append(arris)
+
+        # se todos os candidatos já foram visitados, considera todos os vertices
+        if len(possible_destinations) == 0:
+            for arris in self.graph.outgoing[current_vertex]:
+                if arris.destination not in self.visited_set:
+                    possible_destinations.append(arris)
 
         if len(possible_destinations) > 0:
             
-            if self.method_of_selection == 'roulette':
-                next_vertex = Roulette(possible_destinations, self.distance_expoent, self.pheromone_expoent).spin().destination
+            if self.exploitation > 0 and self.rng.random() < self.exploitation:
+                next_vertex = max(possible_destinations, key=lambda arris: arris.evaluate_arris(self.distance_expoent, self.pheromone_expoent)).destination
+            elif self.method_of_selection == 'roulette':
+                next_vertex = Roulette(possible_destinations, self.distance_expoent, self.pheromone_expoent, self.rng).spin().destination
             elif self.method_of_selection == 'tourney':
-                next_vertex = Tourney(possible_destinations, self.distance_expoent, self.pheromone_expoent).compete().destination
+                next_vertex = Tourney(possible_destinations, self.distance_expoent, self.pheromone_expoent, self.rng).compete().destination
             self.visited_vertex.append(next_vertex)
+            self.visited_set.add(next_vertex)
             self.current_vertex = next_vertex
 
+            if self.local_update is not None:
+                self.local_update(self.graph, current_vertex, next_vertex)
+                # ao completar o caminho, a aresta de volta ao ponto de partida também é atualizada
+                if len(self.visited_vertex) == len(self.graph.vertex_list):
+                    self.local_update(self.graph, next_vertex, self.visited_vertex[0])
+
             # se a formiga se moveu retorna True
             return True
 
@@ -163,6 +972,25 @@ class Ant():
             # se a formiga não se moveu retorna False
             return False
         
+    @classmethod
+    def from_tour(cls, 
+                  tour:np.ndarray, 
+                  graph:CompleteGraph, 
+                  method_of_selection:str, 
+                  distance_expoent:float, 
+                  pheromone_expoent:float, 
+                  candidate_list_size:int=None):
+        # recria uma formiga a partir de um caminho como array de indices em graph.vertex_list, por exemplo vindo de um checkpoint
+        ant = cls(graph.vertex_list[int(tour[0])], graph, method_of_selection, distance_expoent, pheromone_expoent, candidate_list_size)
+        ant.visited_vertex = [graph.vertex_list[i] for i in tour.tolist()]
+        ant.visited_set = set(ant.visited_vertex)
+        ant.current_vertex = ant.visited_vertex[-1]
+        return ant
+
+    def compact_tour(self):
+        # caminho como array de indices em graph.vertex_list
+        return np.array([self.graph.vertex_index[vertex] for vertex in self.visited_vertex], dtype=np.int32)
+
     def calculate_distance(self):
 
         path = []      
@@ -181,6 +1009,453 @@ class Ant():
         
         return distance
     
+class MatrixAnt(Ant):
+    def __init__ (self, 
+                  current_vertex:int, 
+                  graph:MatrixGraph, 
+                  method_of_selection:str, 
+                  distance_expoent:float, 
+                  pheromone_expoent:float, 
+                  candidate_list_size:int=None, 
+                  rng:RandomStream=None, 
+                  exploitation:float=0, 
+                  local_update=None):
+
+        # no modo matricial os vertices são representados pelo seu indice em graph.vertex_list
+        number_of_vertex = len(graph.vertex_list)
+
+        self.current_vertex = current_vertex
+        self.graph = graph
+        self.method_of_selection = method_of_selection
+        self.distance_expoent = distance_expoent
+        self.pheromone_expoent = pheromone_expoent
+        self.weight_matrix = graph.weights(distance_expoent, pheromone_expoent)
+        self.candidate_list_size = candidate_list_size
+        self.candidate_list = None if candidate_list_size is None else graph.candidate_list(candidate_list_size)
+        self.rng = rng if rng is not None else RandomStream()
+        self.exploitation = exploitation
+        self.local_update = local_update
+
+        self.tour = np.empty(number_of_vertex, dtype=np.int64)
+        self.tour[0] = current_vertex
+        self.tour_size = 1
+        self.unvisited = np.ones(number_of_vertex, dtype=bool)
+        self.unvisited[current_vertex] = False
+        self.distance = None
+
+    @classmethod
+    def from_tour(cls, 
+                  tour:np.ndarray, 
+                  graph:MatrixGraph, 
+                  method_of_selection:str, 
+                  distance_expoent:float, 
+                  pheromone_expoent:float, 
+                  candidate_list_size:int=None):
+        # recria uma formiga a partir de um caminho já construido, por exemplo em outro processo
+        ant = cls(int(tour[0]), graph, method_of_selection, distance_expoent, pheromone_expoent, candidate_list_size)
+        ant.tour[:len(tour)] = tour
+        ant.tour_size = len(tour)
+        ant.unvisited[tour] = False
+        ant.current_vertex = int(tour[-1])
+        return ant
+
+    @property
+    def visited_vertex(self):
+        return [self.graph.vertex_list[i] for i in self.tour[:self.tour_size]]
+
+    def move(self):
+        if self.tour_size == len(self.tour):
+            # se a formiga não se moveu retorna False
+            return False
+
+        possible_destinations = None
+
+        # com a lista de candidatos, a formiga escolhe apenas entre os vizinhos mais proximos ainda não visitados
+        if self.candidate_list is not None:
+            candidates = self.candidate_list[self.current_vertex]
+            candidates = candidates[self.unvisited[candidates]]
+            if len(candidates) > 0:
+                possible_destinations = candidates
+
+        # se todos os candidatos já foram visitados, considera todos os vertices não visitados
+        if possible_destinations is None:
+            possible_destinations = np.flatnonzero(self.unvisited)
+
+        weights = self.weight_matrix[self.current_vertex, possible_destinations]
+
+        if self.exploitation > 0 and self.rng.random() < self.exploitation:
+            next_vertex = int(possible_destinations[np.argmax(weights)])
+        elif self.method_of_selection == 'roulette':
+            next_vertex = int(possible_destinations[self.spin(weights)])
+        elif self.method_of_selection == 'tourney':
+            next_vertex = int(possible_destinations[self.compete(weights)])
+        else:
+            raise Exception("Error: Invalid method of selection")
+
+        previous_vertex = self.current_vertex
+        self.tour[self.tour_size] = next_vertex
+        self.tour_size += 1
+        self.unvisited[next_vertex] = False
+        self.current_vertex = next_vertex
+        self.distance = None
+
+        if self.local_update is not None:
+            self.local_update(self.graph, previous_vertex, next_vertex)
+            # ao completar o caminho, a aresta de volta ao ponto de partida também é atualizada
+            if self.tour_size == len(self.tour):
+                self.local_update(self.graph, next_vertex, int(self.tour[0]))
+
+        # se a formiga se moveu retorna True
+        return True
+
+    def spin(self, weights:np.ndarray):
+        # equivalente ao Roulette.spin, sorteia uma posição com probabilidade proporcional a sua avaliação
+        cumulative_weights = np.cumsum(weights)
+        total = cumulative_weights[-1]
+
+        if not np.isfinite(total):
+            # uma distancia zero (por exemplo coordenadas repetidas) dá avaliação infinita, como no acoc.cluster_probability
+            # apenas essas posições podem ser escolhidas, com a mesma probabilidade; avaliações indefinidas contam como zero
+            infinite = np.flatnonzero(np.isposinf(weights))
+            if len(infinite):
+                return int(self.rng.choice(infinite))
+            cumulative_weights = np.cumsum(np.nan_to_num(weights, nan=0.0))
+            total = cumulative_weights[-1]
+
+        if total <= 0:
+            return self.rng.randrange(len(weights))
+
+        # o sorteio pode cair exatamente no total por arredondamento, a posição é limitada à ultima
+        return min(int(np.searchsorted(cumulative_weights, self.rng.random()*total, side='right')), len(weights) - 1)
+
+    def compete(self, weights:np.ndarray):
+        # equivalente ao Tourney.compete, duas posições sorteadas competem pela avaliação
+        competitor_1 = self.rng.randrange(len(weights))
+        competitor_2 = self.rng.randrange(len(weights))
+
+        if weights[competitor_1] > weights[competitor_2]:
+            return competitor_1
+        elif weights[competitor_1] < weights[competitor_2]:
+            return competitor_2
+        else:
+            return self.rng.choice([competitor_1, competitor_2])
+
+    def compact_tour(self):
+        return self.tour[:self.tour_size].astype(np.int32)
+
+    def set_tour(self, tour:np.ndarray):
+        # substitui o caminho completo da formiga, por exemplo pelo resultado da busca local
+        self.tour[:len(tour)] = tour
+        self.tour_size = len(tour)
+        self.current_vertex = int(tour[-1])
+        self.distance = None
+
+    def calculate_distance(self):
+        if self.distance is None:
+            self.distance = self.graph.tour_length(self.tour[:self.tour_size])
+        return self.distance
+
+class SparseAnt(MatrixAnt):
+    def __init__ (self, 
+                  current_vertex:int, 
+                  graph:SparseGraph, 
+                  method_of_selection:str, 
+                  distance_expoent:float, 
+                  pheromone_expoent:float, 
+                  candidate_list_size:int=None, 
+                  rng:RandomStream=None, 
+                  exploitation:float=0, 
+                  local_update=None):
+
+        # formiga usada com o SparseGraph: escolhe entre as arestas guardadas que saem do vertice atual
+        # as listas de candidatos já são as arestas guardadas, então candidate_list_size não é usado
+        number_of_vertex = len(graph.vertex_list)
+
+        self.current_vertex = current_vertex
+        self.graph = graph
+        self.method_of_selection = method_of_selection
+        self.distance_expoent = distance_expoent
+        self.pheromone_expoent = pheromone_expoent
+        self.weight_array = graph.weights(distance_expoent, pheromone_expoent)
+        self.candidate_list_size = candidate_list_size
+        self.rng = rng if rng is not None else RandomStream()
+        self.exploitation = exploitation
+        self.local_update = local_update
+
+        self.tour = np.empty(number_of_vertex, dtype=np.int64)
+        self.tour[0] = current_vertex
+        self.tour_size = 1
+        self.unvisited = np.ones(number_of_vertex, dtype=bool)
+        self.unvisited[current_vertex] = False
+        self.distance = None
+
+    def move(self):
+        if self.tour_size == len(self.tour):
+            # se a formiga não se moveu retorna False
+            return False
+
+        start, end = self.graph.indptr[self.current_vertex], self.graph.indptr[self.current_vertex + 1]
+        neighbours = self.graph.indices[start:end]
+        available = self.unvisited[neighbours]
+
+        if available.any():
+            possible_destinations = neighbours[available]
+            weights = self.weight_array[start:end][available]
+        elif self.graph.coordinates is not None:
+            # sem vizinhos disponiveis, considera todos os vertices não visitados, com a distancia calculada sob demanda
+            possible_destinations = np.flatnonzero(self.unvisited)
+            weights = self.graph.fallback_weights(self.current_vertex, possible_destinations, self.distance_expoent, self.pheromone_expoent)
+        else:
+            # sem arestas para vertices não visitados a formiga fica presa e o caminho é inviavel
+            return False
+
+        if self.exploitation > 0 and self.rng.random() < self.exploitation:
+            next_vertex = int(possible_destinations[np.argmax(weights)])
+        elif self.method_of_selection == 'roulette':
+            next_vertex = int(possible_destinations[self.spin(weights)])
+        elif self.method_of_selection == 'tourney':
+            next_vertex = int(possible_destinations[self.compete(weights)])
+        else:
+            raise Exception("Error: Invalid method of selection")
+
+        previous_vertex = self.current_vertex
+        self.tour[self.tour_size] = next_vertex
+        self.tour_size += 1
+        self.unvisited[next_vertex] = False
+        self.current_vertex = next_vertex
+        self.distance = None
+
+        if self.local_update is not None:
+            self.local_update(self.graph, previous_vertex, next_vertex)
+            if self.tour_size == len(self.tour):
+                self.local_update(self.graph, next_vertex, int(self.tour[0]))
+
+        # se a formiga se moveu retorna True
+        return True
+
+    def calculate_distance(self):
+        if self.distance is None:
+            # caminho incompleto (formiga presa) é inviavel
+            if self.tour_size < len(self.tour):
+                self.distance = np.inf
+            else:
+                self.distance = self.graph.tour_length(self.tour)
+        return self.distance
+
+class AntSystem():
+    # regra classica: todas as formigas depositam update_constant/distancia nas arestas que usaram e todas as arestas evaporam
+    exploitation = 0
+    local_update = None
+
+    def __init__(self, 
+                 evaporation_constant:float=0.01, 
+                 update_constant:float=2):
+        self.evaporation_constant = evaporation_constant
+        self.update_constant = update_constant
+
+    def update(self, graph, generation:list, best_ant):
+        graph.update_pheromone(generation, self.update_constant, self.evaporation_constant)
+
+    def deposit_migrant(self, graph, migrant, best_ant):
+        # solução vinda de outra colonia (ver ACO.accept_migrant): apenas o deposito, sem evaporação,
+        # para que a migração não altere o ritmo de evaporação da colonia
+        graph.deposit_tour(migrant, self.update_constant / migrant.calculate_distance())
+
+    def state(self):
+        # estado que muda durante a execução, guardado nos checkpoints
+        return {}
+
+    def load_state(self, state:dict):
+        pass
+
+    def restart(self):
+        # chamado quando a instancia muda (ver ACO.apply_delta), para descartar o que dependia das distancias antigas
+        pass
+
+class MaxMinAntSystem():
+    # MAX-MIN Ant System: apenas a melhor formiga deposita, e o feromonio fica limitado a [pheromone_min, pheromone_max]
+    # se a melhor solução não melhora por stagnation_limit épocas, o feromonio é reiniciado em pheromone_max
+    exploitation = 0
+    local_update = None
+
+    def __init__(self, 
+                 evaporation_constant:float=0.02, 
+                 update_constant:float=1, 
+                 p_best:float=0.05, 
+                 stagnation_limit:int=50, 
+                 use_best_so_far:bool=False):
+        self.evaporation_constant = evaporation_constant
+        self.update_constant = update_constant
+        self.p_best = p_best
+        self.stagnation_limit = stagnation_limit
+        # deposita com a melhor formiga de todas as épocas em vez da melhor da época
+        self.use_best_so_far = use_best_so_far
+
+        self.pheromone_max = None
+        self.pheromone_min = None
+        self.best_distance = np.inf
+        self.stagnation = 0
+
+    def update_limits(self, number_of_vertex:int, best_distance:float):
+        self.pheromone_max = self.update_constant / (self.evaporation_constant * best_distance)
+        if number_of_vertex > 2:
+            p = self.p_best**(1/number_of_vertex)
+            self.pheromone_min = self.pheromone_max * (1 - p) / ((number_of_vertex/2 - 1) * p)
+        else:
+            self.pheromone_min = 0
+        self.pheromone_min = min(self.pheromone_min, self.pheromone_max)
+
+    def update(self, graph, generation:list, best_ant):
+        # enquanto nenhuma formiga completou um caminho (engine 'sparse' com adjacency) os limites não podem ser estimados
+        # e o feromonio não muda
+        if not np.isfinite(best_ant.calculate_distance()):
+            return
+
+        first_update = self.pheromone_max is None
+
+        if best_ant.calculate_distance() < self.best_distance:
+            self.best_distance = best_ant.calculate_distance()
+            self.update_limits(len(graph.vertex_list), self.best_distance)
+            self.stagnation = 0
+        else:
+            self.stagnation += 1
+
+        # o feromonio começa no limite superior, estimado a partir da primeira solução
+        if first_update:
+            graph.reset_pheromone(self.pheromone_max)
+
+        if self.use_best_so_far:
+            depositing_ant = best_ant
+        else:
+            depositing_ant = min(generation, key=lambda ant: ant.calculate_distance())
+
+        graph.evaporate(self.evaporation_constant)
+        graph.deposit_tour(depositing_ant, self.update_constant / depositing_ant.calculate_distance())
+        graph.clamp_pheromone(self.pheromone_min, self.pheromone_max)
+
+        if self.stagnation_limit is not None and self.stagnation >= self.stagnation_limit:
+            graph.reset_pheromone(self.pheromone_max)
+            self.stagnation = 0
+
+    def deposit_migrant(self, graph, migrant, best_ant):
+        # solução vinda de outra colonia: deposita sem evaporação e não conta como uma época para a estagnação;
+        # se ela é a nova melhor, os limites são recalculados a partir dela
+        first_update = self.pheromone_max is None
+
+        if best_ant.calculate_distance() < self.best_distance:
+            self.best_distance = best_ant.calculate_distance()
+            self.update_limits(len(graph.vertex_list), self.best_distance)
+            self.stagnation = 0
+
+        if first_update:
+            graph.reset_pheromone(self.pheromone_max)
+
+        graph.deposit_tour(migrant, self.update_constant / migrant.calculate_distance())
+        graph.clamp_pheromone(self.pheromone_min, self.pheromone_max)
+
+    def state(self):
+        return {'pheromone_max':self.pheromone_max,
+                'pheromone_min':self.pheromone_min,
+                'best_distance':self.best_distance,
+                'stagnation':self.stagnation}
+
+    def load_state(self, state:dict):
+        self.pheromone_max = state['pheromone_max']
+        self.pheromone_min = state['pheromone_min']
+        self.best_distance = state['best_distance']
+        self.stagnation = state['stagnation']
+
+    def restart(self):
+        # a melhor distancia antiga não vale para a nova instancia, os limites são recalculados na proxima atualização
+        self.best_distance = np.inf
+        self.stagnation = 0
+
+class AntColonySystem():
+    # Ant Colony System: as formigas escolhem a melhor aresta com probabilidade exploitation (q0),
+    # cada aresta percorrida tem seu feromonio aproximado do inicial (atualização local)
+    # e apenas as arestas da melhor solução de todas as épocas recebem a atualização global
+    def __init__(self, 
+                 evaporation_constant:float=0.1, 
+                 update_constant:float=1, 
+                 exploitation:float=0.9, 
+                 local_evaporation:float=0.1, 
+                 initial_pheromone:float=None):
+        self.evaporation_constant = evaporation_constant
+        self.update_constant = update_constant
+        self.exploitation = exploitation
+        self.local_evaporation = local_evaporation
+        # por padrão o feromonio inicial do grafo
+        self.initial_pheromone = initial_pheromone
+
+    def local_update(self, graph, origin, destination):
+        initial_pheromone = graph.initial_pheromone if self.initial_pheromone is None else self.initial_pheromone
+        graph.local_update(origin, destination, self.local_evaporation, initial_pheromone)
+
+    def update(self, graph, generation:list, best_ant):
+        graph.reinforce_tour(best_ant, self.evaporation_constant, self.update_constant / best_ant.calculate_distance())
+
+    def deposit_migrant(self, graph, migrant, best_ant):
+        # a atualização global do ACS só muda as arestas do caminho, aqui as do caminho recebido
+        graph.reinforce_tour(migrant, self.evaporation_constant, self.update_constant / migrant.calculate_distance())
+
+    def state(self):
+        return {}
+
+    def load_state(self, state:dict):
+        pass
+
+    def restart(self):
+        pass
+
+# fases de cada época, usadas nos tempos acumulados de ACO.timings
+PHASES = ('construction', 'local_search', 'evaluation', 'update', 'history')
+
+UPDATE_STRATEGIES = {'as':AntSystem, 'mmas':MaxMinAntSystem, 'acs':AntColonySystem}
+
+class SharedWeightsGraph():
+    # visão do grafo dentro de um processo de trabalho: apenas a matriz de avaliação, compartilhada com o processo principal,
+    # e as listas de candidatos, que são o suficiente para construir os caminhos
+    def __init__(self, 
+                 weight_matrix:np.ndarray, 
+                 candidate_lists:dict):
+        self.vertex_list = range(len(weight_matrix))
+        self.weight_matrix = weight_matrix
+        self.candidate_lists = candidate_lists
+
+    def weights(self, distance_expoent:float, pheromone_expoent:float):
+        return self.weight_matrix
+
+    def candidate_list(self, size:int):
+        return self.candidate_lists[size]
+
+# estado de cada processo de trabalho, preenchido uma unica vez na criação do pool
+worker_state = {}
+
+def init_construction_worker(shared_name:str, 
+                             shape:tuple, 
+                             candidate_lists:dict, 
+                             method_of_selection:str, 
+                             distance_expoent:float, 
+                             pheromone_expoent:float, 
+                             candidate_list_size:int, 
+                             entropy:int):
+    shared_weights = SharedArray(shape, name=shared_name)
+    worker_state['shared_weights'] = shared_weights
+    worker_state['graph'] = SharedWeightsGraph(shared_weights.array, candidate_lists)
+    worker_state['parameters'] = (method_of_selection, distance_expoent, pheromone_expoent, candidate_list_size)
+    worker_state['entropy'] = entropy
+
+def construct_tours(tasks:list):
+    # tasks é uma lista de (vertice inicial, chaves do gerador da formiga), devolve os caminhos como arrays de inteiros
+    tours = []
+    for start_vertex, keys in tasks:
+        ant = MatrixAnt(start_vertex, worker_state['graph'], *worker_state['parameters'], rng=random_stream(worker_state['entropy'], *keys))
+        keep_moving = True
+        while keep_moving:
+            keep_moving = ant.move()
+        tours.append(ant.tour.astype(np.int32))
+    return tours
+
 class ACO():
     def __init__(self, 
                  vertex_list:list, 
@@ -191,10 +1466,43 @@ class ACO():
                  number_of_epochs:int=1000, 
                  method_of_selection:str='roulette', 
                  distance_expoent:float=1.0, 
-                 pheromone_expoent:float=1.0):
+                 pheromone_expoent:float=1.0, 
+                 engine:str='object', 
+                 number_of_ants:int=None, 
+                 distance_matrix:np.ndarray=None, 
+                 coordinates:np.ndarray=None, 
+                 candidate_list_size:int=None, 
+                 workers:int=None, 
+                 seed:int=None, 
+                 history:str='full', 
+                 keep_best:int=1, 
+                 local_search:str=None, 
+                 local_search_scope:str='best', 
+                 update_strategy='as', 
+                 adjacency:tuple=None, 
+                 metric:str='euclidean', 
+                 callbacks:list=None, 
+                 autorun:bool=True):
         
         self.initial_pheromone = initial_pheromone
-        self.graph = CompleteGraph(vertex_list, distance_dict, self.initial_pheromone)
+        self.engine = engine
+
+        # engine = 'object' usa as instancias de Arris, engine = 'matrix' usa matrizes de distancia e feromonio
+        # engine = 'sparse' guarda apenas as arestas dos vizinhos mais proximos (coordinates) ou as arestas dadas em adjacency
+        if self.engine == 'object':
+            self.graph = CompleteGraph(vertex_list, distance_dict, self.initial_pheromone)
+        elif self.engine == 'matrix':
+            self.graph = MatrixGraph(vertex_list, distance_dict, self.initial_pheromone, distance_matrix=distance_matrix, coordinates=coordinates)
+        elif self.engine == 'sparse':
+            self.graph = SparseGraph(vertex_list, coordinates, adjacency, self.initial_pheromone, number_of_neighbours=candidate_list_size or 10, metric=metric)
+        else:
+            raise Exception("Error: Invalid engine")
+
+        # por padrão é criada uma formiga por vertice
+        self.number_of_ants = number_of_ants
+
+        # se definido, as formigas escolhem apenas entre os candidate_list_size vizinhos mais proximos de cada vertice
+        self.candidate_list_size = candidate_list_size
         self.evaporation_constant = evaporation_constant
         self.update_constant = update_constant
         self.number_of_epochs = number_of_epochs
@@ -202,29 +1510,372 @@ class ACO():
         self.distance_expoent = distance_expoent
         self.pheromone_expoent = pheromone_expoent
         self.last_generation = []
-        self.epochs_dict = {}
+        self.epoch = 0
 
-        self.run()
+        # tempo acumulado (em segundos) de cada fase das épocas
+        self.timings = dict.fromkeys(PHASES, 0.0)
 
-    def run(self):
-        for i in range(self.number_of_epochs):
-        
-            self.last_generation = []
+        # melhor formiga de todas as épocas
+        self.best_ant = None
+
+        # regra de atualização do feromonio: 'as' (Ant System, padrão), 'mmas' (MAX-MIN Ant System), 'acs' (Ant Colony System)
+        # ou uma instancia de AntSystem, MaxMinAntSystem ou AntColonySystem com parametros proprios
+        if isinstance(update_strategy, str):
+            if update_strategy not in UPDATE_STRATEGIES:
+                raise Exception("Error: Invalid update strategy")
+            update_strategy = UPDATE_STRATEGIES[update_strategy](evaporation_constant=evaporation_constant, update_constant=update_constant)
+        self.update_strategy = update_strategy
+
+        # history = 'full' guarda todas as formigas de cada época em epochs_dict, como antes
+        # history = 'best' guarda apenas o resumo de cada época e os keep_best melhores caminhos como arrays de inteiros
+        # history = 'summary' guarda apenas o melhor, a média e o pior custo de cada época
+        self.history = History(history, number_of_epochs, keep_best)
+        self.epochs_dict = self.history.epochs_dict
+
+        # com workers, as formigas de cada época são construidas em um pool de processos (apenas no engine 'matrix')
+        self.workers = workers
+        if self.workers is not None and self.workers > 1 and self.engine != 'matrix':
+            raise Exception("Error: Parallel construction requires engine='matrix'")
+        if self.workers is not None and self.workers > 1 and self.update_strategy.local_update is not None:
+            raise Exception("Error: Parallel construction does not support local pheromone updates")
+
+        # cada execução tem sua propria SeedSequence, e cada formiga um gerador filho, derivado da época e do seu indice,
+        # assim varias execuções podem rodar no mesmo processo sem interferir e o resultado não depende do numero de processos
+        # sem semente, a entropia é sorteada pelo numpy e fica em entropy
+        self.seed = seed
+        self.entropy = np.random.SeedSequence(seed).entropy
+
+        self.pool = None
+        self.shared_weights = None
+
+        # busca local aplicada aos caminhos construidos antes da atualização de feromonio (engines 'matrix' e 'sparse')
+        # local_search = '2-opt', 'or-opt' ou '2-opt+or-opt'; local_search_scope = 'best' (só a melhor formiga da época) ou 'all'
+        self.local_search = local_search
+        self.local_search_scope = local_search_scope
+        if self.local_search is not None:
+            if self.engine not in ('matrix', 'sparse'):
+                raise Exception("Error: Local search requires engine='matrix' or engine='sparse'")
+            if self.local_search not in LOCAL_SEARCH_METHODS:
+                raise Exception("Error: Invalid local search method")
+            if self.local_search_scope not in ('best', 'all'):
+                raise Exception("Error: Invalid local search scope")
+
+        # callbacks (ver callbacks.py) chamados ao fim de cada época, podem interromper a execução
+        # com autorun=False o construtor apenas prepara o algoritmo, e a execução é feita chamando run
+        self.callbacks = callbacks if callbacks is not None else []
+        self.stopped_by = None
+        self.interrupted = False
+
+        if autorun:
+            self.run()
+
+    def run(self, 
+            number_of_epochs:int=None, 
+            callbacks:list=None):
+        # executa number_of_epochs épocas (por padrão, as do construtor) a partir da ultima época executada
+        # a execução termina antes se algum callback devolver True, e o callback fica em stopped_by
+        # se a execução terminar com uma exceção (inclusive KeyboardInterrupt), interrupted fica True durante on_run_end
+        if number_of_epochs is None:
+            number_of_epochs = self.number_of_epochs
+        if callbacks is None:
+            callbacks = self.callbacks
+        self.stopped_by = None
+
+        if self.workers is not None and self.workers > 1:
+            self.start_workers()
+
+        for callback in callbacks:
+            callback.on_run_start(self)
+
+        start = time.perf_counter()
+
+        self.interrupted = True
+        try:
+            for _ in range(number_of_epochs):
+                timings = self.run_epoch()
+
+                metrics = {'epoch':self.epoch,
+                           'timings':timings,
+                           'iteration_best_cost':float(self.history.best_costs[-1]),
+                           'mean_cost':float(self.history.mean_costs[-1]),
+                           'best_cost':float(self.best_ant.calculate_distance()),
+                           'elapsed':time.perf_counter() - start}
+
+                # todos os callbacks são chamados, mesmo quando um deles pede a interrupção
+                stop = [callback for callback in callbacks if callback.on_epoch_end(self, metrics)]
+                if stop:
+                    self.stopped_by = stop[0]
+                    break
+            self.interrupted = False
+        finally:
+            self.stop_workers()
+            for callback in callbacks:
+                callback.on_run_end(self)
+
+    def parameters(self):
+        # parametros que precisam ser os mesmos para continuar uma execução a partir de um checkpoint
+        return {'engine':self.engine,
+                'number_of_vertex':len(self.graph.vertex_list),
+                'number_of_ants':self.number_of_ants,
+                'candidate_list_size':self.candidate_list_size,
+                'method_of_selection':self.method_of_selection,
+                'distance_expoent':self.distance_expoent,
+                'pheromone_expoent':self.pheromone_expoent,
+                'update_strategy':type(self.update_strategy).__name__,
+                'evaporation_constant':self.update_strategy.evaporation_constant,
+                'update_constant':self.update_strategy.update_constant,
+                'local_search':self.local_search,
+                'local_search_scope':self.local_search_scope,
+                'seed':self.seed}
+
+    def save_checkpoint(self, path:str):
+        # grava o feromonio, a melhor formiga, a época, o estado do gerador aleatorio e o histórico em um .npz (ver checkpoint.py)
+        # as formigas são guardadas apenas como arrays de indices
+        arrays = {'pheromone':self.graph.get_pheromone()}
+        metadata = {'algorithm':'aco',
+                    'epoch':self.epoch,
+                    'parameters':self.parameters(),
+                    'strategy':self.update_strategy.state()}
+
+        if self.best_ant is not None:
+            arrays['best_tour'] = self.best_ant.compact_tour()
+
+        # os geradores das formigas são derivados da entropia da execução e da época
+        metadata['entropy'] = self.entropy
+
+        for key, value in self.history.state().items():
+            arrays['history_' + key] = value
+
+        save_checkpoint(path, arrays, metadata)
+
+    def load_checkpoint(self, path:str):
+        # restaura o estado gravado por save_checkpoint; a instancia deve ter sido criada com os mesmos parametros (e autorun=False)
+        # depois disso, run continua a execução a partir da época gravada
+        arrays, metadata = load_checkpoint(path)
+        if metadata['algorithm'] != 'aco':
+            raise Exception("Error: The checkpoint was not created by ACO")
+        check_parameters(metadata['parameters'], self.parameters())
+
+        self.graph.set_pheromone(arrays['pheromone'])
+        self.epoch = metadata['epoch']
+        self.update_strategy.load_state(metadata['strategy'])
+        self.last_generation = []
+
+        self.best_ant = None
+        if 'best_tour' in arrays:
+            self.best_ant = self.ant_from_tour(arrays['best_tour'])
+
+        self.entropy = metadata['entropy']
+
+        self.history.load_state({key[len('history_'):]:value for key, value in arrays.items() if key.startswith('history_')})
+
+    def ant_from_tour(self, tour:np.ndarray):
+        # formiga do engine da instancia a partir de um caminho como array de indices em graph.vertex_list
+        ant_class = {'object':Ant, 'matrix':MatrixAnt, 'sparse':SparseAnt}[self.engine]
+        return ant_class.from_tour(np.asarray(tour), self.graph, self.method_of_selection, self.distance_expoent, self.pheromone_expoent, self.candidate_list_size)
+
+    def accept_migrant(self, tour:np.ndarray):
+        # recebe um caminho de outra colonia (ver island.py): ele deposita feromonio pela regra da instancia, sem evaporação
+        # e sem contar como uma época (deposit_migrant), e passa a ser a melhor formiga se for melhor que ela
+        migrant = self.ant_from_tour(tour)
+        if not np.isfinite(migrant.calculate_distance()):
+            return
+        if self.best_ant is None or migrant.calculate_distance() < self.best_ant.calculate_distance():
+            self.best_ant = migrant
+        self.update_strategy.deposit_migrant(self.graph, migrant, self.best_ant)
+
+    def apply_delta(self, 
+                    changed_edges:dict=None, 
+                    added_vertices:dict=None, 
+                    removed_vertices:list=None, 
+                    repair:float=0.5):
+        # altera a instancia (TSP dinamico) sem recriar a colonia, mantendo o feromonio aprendido e a melhor formiga;
+        # depois disso, run continua a otimização a partir desse estado, em geral com bem menos épocas que do zero
+        # changed_edges: {(origem, destino): distancia}, apenas na direção dada
+        # added_vertices: {vertice: {outro vertice: distancia}}, com a distancia para cada vertice, existente ou novo, nas duas direções
+        # removed_vertices: lista de vertices a remover
+        # repair (entre 0 e 1) aproxima do feromonio inicial o feromonio das arestas que mudaram de distancia
+        if self.engine == 'sparse':
+            raise Exception("Error: apply_delta requires engine='object' or engine='matrix'")
+
+        # o caminho da melhor formiga é guardado como vertices, os indices mudam com a instancia
+        best_tour = self.best_ant.visited_vertex if self.best_ant is not None else None
+
+        if removed_vertices:
+            if self.engine == 'object':
+                self.graph.remove_vertices(removed_vertices)
+            else:
+                self.graph.remove_vertices([self.graph.vertex_index[vertex] for vertex in removed_vertices])
+
+        if added_vertices:
+            if self.engine == 'object':
+                self.graph.add_vertices(added_vertices)
+            else:
+                vertex_list = self.graph.vertex_list + list(added_vertices)
+                distances = np.zeros((len(added_vertices), len(vertex_list)), dtype=np.float64)
+                for i, (vertex, row) in enumerate(added_vertices.items()):
+                    for j, other in enumerate(vertex_list):
+                        if other != vertex:
+                            distances[i, j] = row[other] if other in row else added_vertices[other][vertex]
+                self.graph.add_vertices(list(added_vertices), distances)
+
+        if changed_edges:
+            if self.engine == 'object':
+                self.graph.update_distances(changed_edges, repair)
+            else:
+                origin = [self.graph.vertex_index[origin] for origin, destination in changed_edges]
+                destination = [self.graph.vertex_index[destination] for origin, destination in changed_edges]
+                self.graph.update_distances(origin, destination, np.array(list(changed_edges.values()), dtype=np.float64), repair)
+
+        # a ultima geração tem indices e distancias da instancia antiga
+        self.last_generation = []
+        self.update_strategy.restart()
+
+        if best_tour is not None:
+            self.best_ant = self.ant_from_tour(self.repair_tour(best_tour, list(added_vertices or [])))
+
+    def repair_tour(self, tour:list, added_vertices:list):
+        # adapta um caminho (lista de vertices) à instancia alterada: os vertices removidos saem do caminho,
+        # cada vertice novo entra na posição de menor acrescimo de distancia (inserção mais barata)
+        # e, com local_search, o caminho resultante passa pela busca local
+        tour = [self.graph.vertex_index[vertex] for vertex in tour if vertex in self.graph.vertex_index]
+        for vertex in added_vertices:
+            index = self.graph.vertex_index[vertex]
+            if index in tour:
+                continue
+            if len(tour) < 2:
+                tour.append(index)
+                continue
+            increase = [self.edge_distance(tour[i], index) + self.edge_distance(index, tour[(i + 1) % len(tour)]) - self.edge_distance(tour[i], tour[(i + 1) % len(tour)])
+                        for i in range(len(tour))]
+            tour.insert(int(np.argmin(increase)) + 1, index)
+
+        tour = np.array(tour, dtype=np.int64)
+        if self.local_search is not None and len(tour) > 3:
+            tour = improve_tour(tour, self.graph.distances, self.graph.candidate_list(self.candidate_list_size or 10), self.local_search)
+        return tour
+
+    def edge_distance(self, origin:int, destination:int):
+        # distancia entre dois vertices dados por indices em graph.vertex_list
+        if self.engine == 'object':
+            return self.graph.arris_dict[(self.graph.vertex_list[origin], self.graph.vertex_list[destination])].distance
+        return self.graph.distances[origin, destination]
+
+    def run_epoch(self):
+        # executa uma época e devolve o tempo de cada fase, que também é somado em timings
+        # self.epoch só avança ao fim da época, assim uma interrupção no meio dela não deixa a contagem adiantada
+        epoch = self.epoch + 1
+        timings = dict.fromkeys(PHASES, 0.0)
+
+        start = time.perf_counter()
+        self.last_generation = self.construct_generation(epoch)
+        timings['construction'] = time.perf_counter() - start
+
+        if self.local_search is not None:
+            start = time.perf_counter()
+            self.improve_generation(self.last_generation)
+            timings['local_search'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        iteration_best = min(self.last_generation, key=lambda ant: ant.calculate_distance())
+        if self.best_ant is None or iteration_best.calculate_distance() < self.best_ant.calculate_distance():
+            self.best_ant = iteration_best
+        timings['evaluation'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        self.update_strategy.update(self.graph, self.last_generation, self.best_ant)
+        timings['update'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        self.record_epoch(self.last_generation, epoch)
+        timings['history'] = time.perf_counter() - start
 
-            for vertex in self.graph.vertex_list:
-                self.last_generation.append(Ant(vertex, self.graph, self.method_of_selection, self.distance_expoent, self.pheromone_expoent))
+        for phase, seconds in timings.items():
+            self.timings[phase] += seconds
 
-            for ant in self.last_generation:
-                
-                keep_moving = True
+        self.epoch = epoch
+        return timings
+
+    def improve_generation(self, generation:list):
+        # a lista de vizinhos da busca local é a mesma lista de candidatos da construção, com 10 vizinhos por padrão
+        neighbour_list = self.graph.candidate_list(self.candidate_list_size or 10)
+
+        if self.local_search_scope == 'best':
+            generation = [min(generation, key=lambda ant: ant.calculate_distance())]
+
+        for ant in generation:
+            # caminhos incompletos (formigas presas no engine 'sparse') não são melhorados
+            if np.isfinite(ant.calculate_distance()):
+                ant.set_tour(improve_tour(ant.tour, self.graph.distances, neighbour_list, self.local_search))
+
+    def record_epoch(self, generation:list, epoch:int):
+        costs = np.array([ant.calculate_distance() for ant in generation])
+        entry = None
+        if self.history.mode == 'full':
+            entry = {"individuals":generation,
+                "evaluation":np.mean(costs)}
+        self.history.record(epoch, costs, lambda i: generation[i].compact_tour(), entry)
+
+    def epoch_rng(self, epoch:int, *keys:int):
+        return random_stream(self.entropy, epoch, *keys)
+
+    def construct_generation(self, epoch:int):
+        if self.number_of_ants is None:
+            start_vertices = self.graph.vertex_list
+        else:
+            start_vertices = [self.graph.vertex_list[i] for i in self.epoch_rng(epoch).integers(len(self.graph.vertex_list), self.number_of_ants).tolist()]
+
+        if self.pool is not None:
+            return self.construct_in_workers(start_vertices, epoch)
+
+        generation = []
+
+        for index, vertex in enumerate(start_vertices):
+            generation.append(self.create_ant(vertex, self.epoch_rng(epoch, index + 1)))
+
+        for ant in generation:
             
-                while keep_moving:
-                    keep_moving = ant.move()
+            keep_moving = True
+        
+            while keep_moving:
+                keep_moving = ant.move()
+
+        return generation
+
+    def construct_in_workers(self, start_vertices:list, epoch:int):
+        # a matriz de avaliação da época é copiada para a memoria compartilhada, os processos recebem apenas o vertice inicial e a semente
+        np.copyto(self.shared_weights.array, self.graph.weights(self.distance_expoent, self.pheromone_expoent))
+
+        tasks = [(self.graph.vertex_index[vertex], (epoch, index + 1)) for index, vertex in enumerate(start_vertices)]
+        tours = [tour for chunk in self.pool.map(construct_tours, split(tasks, self.workers)) for tour in chunk]
 
-            self.graph.update_pheromone(self.last_generation, self.update_constant, self.evaporation_constant)
+        return [MatrixAnt.from_tour(tour, self.graph, self.method_of_selection, self.distance_expoent, self.pheromone_expoent, self.candidate_list_size) for tour in tours]
 
-            self.epochs_dict[i+1] = {"individuals":self.last_generation,
-                "evaluation":np.mean([ant.calculate_distance() for ant in self.last_generation])}
+    def start_workers(self):
+        number_of_vertex = len(self.graph.vertex_list)
+        self.shared_weights = SharedArray((number_of_vertex, number_of_vertex))
+
+        candidate_lists = {}
+        if self.candidate_list_size is not None:
+            candidate_lists[self.candidate_list_size] = self.graph.candidate_list(self.candidate_list_size)
+
+        self.pool = create_pool(self.workers, init_construction_worker, (self.shared_weights.name, self.shared_weights.shape, candidate_lists, self.method_of_selection, self.distance_expoent, self.pheromone_expoent, self.candidate_list_size, self.entropy))
+
+    def stop_workers(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+        if self.shared_weights is not None:
+            self.shared_weights.close()
+            self.shared_weights = None
+
+    def create_ant(self, vertex, rng:RandomStream=None):
+        if self.engine == 'sparse':
+            return SparseAnt(self.graph.vertex_index[vertex], self.graph, self.method_of_selection, self.distance_expoent, self.pheromone_expoent, self.candidate_list_size, rng, self.update_strategy.exploitation, self.update_strategy.local_update)
+        if self.engine == 'matrix':
+            return MatrixAnt(self.graph.vertex_index[vertex], self.graph, self.method_of_selection, self.distance_expoent, self.pheromone_expoent, self.candidate_list_size, rng, self.update_strategy.exploitation, self.update_strategy.local_update)
+        return Ant(vertex, self.graph, self.method_of_selection, self.distance_expoent, self.pheromone_expoent, self.candidate_list_size, rng, self.update_strategy.exploitation, self.update_strategy.local_update)
 
 if __name__ == "__main__":
     #lista dos vertices do grafo, ou seja os pontos que serao visitados
@@ -249,7 +1900,8 @@ if __name__ == "__main__":
               number_of_epochs=50,
               method_of_selection='roulette',
               distance_expoent=1,
-              pheromone_expoent=2)
+              pheromone_expoent=2,
+              seed=42)
 
     for epoch in aco.epochs_dict:
         print(f'Epoch {epoch}: {aco.epochs_dict[epoch]["evaluation"]}')
@@ -264,6 +1916,9 @@ if __name__ == "__main__":
         print(f'{arris.origin} -> {arris.destination} : {arris.pheromone}')
     
     #plota um grafico com a evolução da avaliação média da população a cada geração
+    #o matplotlib é importado apenas aqui, importar o modulo não deve carregá-lo
+    import matplotlib.pyplot as plt
+
     plt.plot(list(aco.epochs_dict.keys()), [aco.epochs_dict[epoch]["evaluation"] for epoch in aco.epochs_dict.keys()], color='green')
     plt.xlabel('Epoch')
     plt.ylabel('Evaluation')
@@ -1,18 +1,22 @@
-import random
+import heapq
+import itertools
+import os
+import tempfile
+import time
 import numpy as np
-import pandas as pd
-
-random.seed(42)
+from checkpoint import check_parameters, load_checkpoint, save_checkpoint
+from history import History
+from parallel import RandomStream, SharedArray, create_pool, random_stream, split
 
 def euclidean_distance(a, b):
-    distance = 0
-    if len(a) != len(b):
+    # aceita vetores ou matrizes (uma linha por ponto), a distancia é calculada ao longo do ultimo eixo
+    # assim a distancia de um objeto para todos os centros é calculada de uma vez
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    if a.shape[-1] != b.shape[-1]:
         raise Exception("The vectors must have the same size")
-    
-    for i in range(len(a)):
-        distance += (a[i] - b[i])**2
 
-    return distance**(1/2)
+    return np.sqrt(np.square(a - b).sum(axis=-1))
 
 class DataObject:
     def __init__(self, 
@@ -49,38 +53,153 @@ class DataObject:
 
 class ACOCGraph:
     def __init__(self, 
-                 data_object_list:list, 
+                 data_object_list:list=None, 
                  number_of_clusters:int=3, 
-                 initial_pheromone:float=0.1):
+                 initial_pheromone:float=0.1, 
+                 dtype=np.float64, 
+                 data:np.ndarray=None, 
+                 target:np.ndarray=None):
         
-        self.data_object_list = data_object_list
         self.number_of_clusters = number_of_clusters
         self.initial_pheromone = initial_pheromone
-        self.matrix = {}
 
-        for obj in self.data_object_list:
-            
-            self.matrix[obj] = {}
-            
-            for i in range(self.number_of_clusters):
-                self.matrix[obj][i] = self.initial_pheromone
+        # os dados de todos os objetos em um unico array (objeto, atributo)
+        # com data (por exemplo vindo de loader.load_array, possivelmente mapeado em memoria) o array é usado sem copia
+        # e as instancias de DataObject só são criadas se data_object_list for usada
+        if data is not None:
+            self.data = data
+            self.target = target
+            self.objects = None
+        elif data_object_list is not None:
+            self.data = np.array([obj.data for obj in data_object_list], dtype=np.float64)
+            self.target = [obj.target for obj in data_object_list]
+            self.objects = data_object_list
+        else:
+            raise Exception("Error: data_object_list or data must be given")
+
+        self.number_of_objects = len(self.data)
+        self.index_cache = None
+
+        # arrays com espaço livre no fim, usados por append_objects para acrescentar objetos sem copiar os anteriores
+        # e os arquivos dos que são mapeados em memoria
+        self.buffers = {}
+        self.buffer_files = {}
+
+        # matriz de feromonio (objeto, cluster), cada linha corresponde ao objeto na mesma posição da data_object_list
+        # com dtype=np.float32 a matriz ocupa metade da memoria
+        self.matrix = np.full((self.number_of_objects, self.number_of_clusters), self.initial_pheromone, dtype=dtype)
+
+    @property
+    def data_object_list(self):
+        if self.objects is None:
+            # cada DataObject guarda uma linha de data, sem copiar os dados
+            self.objects = [DataObject(id=i, data=self.data[i], target=None if self.target is None else self.target[i]) for i in range(self.number_of_objects)]
+        return self.objects
+
+    @property
+    def object_index(self):
+        # posição de cada objeto na data_object_list, usada para representar as soluções de forma compacta
+        if self.index_cache is None:
+            self.index_cache = {obj:i for i, obj in enumerate(self.data_object_list)}
+        return self.index_cache
+
+    def __getstate__(self):
+        # ao enviar o grafo para outros processos, um array mapeado em memoria é reaberto a partir do arquivo, sem copiar os dados
+        state = self.__dict__.copy()
+        state['index_cache'] = None
+        state['buffers'] = {}
+        if isinstance(self.data, np.memmap) and self.data.filename is not None:
+            state['data'] = None
+            state['objects'] = None
+            state['memmap'] = (self.data.filename, self.data.dtype.str, self.data.shape, self.data.offset)
+        return state
+
+    def __setstate__(self, state):
+        memmap = state.pop('memmap', None)
+        self.__dict__.update(state)
+        if memmap is not None:
+            filename, dtype, shape, offset = memmap
+            self.data = np.memmap(filename, dtype=np.dtype(dtype), mode='r', shape=shape, offset=offset)
     
+    def extend(self, name: str, array: np.ndarray, values: np.ndarray):
+        # devolve array (uma view do inicio do buffer name) com values no fim; a capacidade do buffer dobra quando falta espaço,
+        # assim acrescentar um lote custa o tamanho do lote, e não o numero de objetos, exceto nas realocações
+        size = len(array)
+        new_size = size + len(values)
+        buffer = self.buffers.get(name)
+        if buffer is None or array.base is not buffer or len(buffer) < new_size:
+            buffer = self.allocate_buffer(name, array, max(new_size, 2*size))
+            self.buffers[name] = buffer
+        buffer[size:new_size] = values
+        return buffer[:new_size]
+
+    def allocate_buffer(self, name: str, array: np.ndarray, capacity: int):
+        # buffer com capacity linhas e o conteudo de array; se array é mapeado de um arquivo (por exemplo por loader.load_array
+        # com mmap=True), o buffer também é, em um .npy ao lado do arquivo original (<nome>-<name>-stream.npy),
+        # assim os dados continuam fora da memoria depois de append_objects
+        shape = (capacity,) + array.shape[1:]
+        if not isinstance(array, np.memmap) or array.filename is None:
+            buffer = np.empty(shape, dtype=array.dtype)
+            buffer[:len(array)] = array
+            return buffer
+
+        path = self.buffer_files.get(name, '{}-{}-stream.npy'.format(os.path.splitext(array.filename)[0], name))
+        # o novo buffer é escrito em um temporario e só então substitui o anterior, que pode ser o proprio array
+        descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.npy')
+        os.close(descriptor)
+        buffer = np.lib.format.open_memmap(temporary, mode='w+', dtype=array.dtype, shape=shape)
+        for start in range(0, len(array), 65536):
+            end = min(start + 65536, len(array))
+            buffer[start:end] = array[start:end]
+        buffer.flush()
+        del buffer
+        os.replace(temporary, path)
+        self.buffer_files[name] = path
+        return np.load(path, mmap_mode='r+')
+
+    def append_objects(self, data: np.ndarray, target: np.ndarray=None):
+        # acrescenta objetos ao fim do grafo, com o feromonio inicial em todos os clusters, e devolve os seus indices
+        data = np.asarray(data, dtype=self.data.dtype).reshape(-1, self.data.shape[1])
+        if self.target is not None:
+            if target is None:
+                raise Exception("Error: The target must be given for the new objects")
+            self.target = self.extend('target', np.asarray(self.target), np.asarray(target))
+
+        index = np.arange(self.number_of_objects, self.number_of_objects + len(data))
+        self.data = self.extend('data', self.data, data)
+        self.matrix = self.extend('matrix', self.matrix, np.full((len(data), self.number_of_clusters), self.initial_pheromone, dtype=self.matrix.dtype))
+        self.number_of_objects += len(data)
+
+        if isinstance(self.data, np.memmap):
+            self.data.flush()
+
+        # as instancias de DataObject são recriadas a partir de data quando forem usadas
+        self.objects = None
+        self.index_cache = None
+        return index
+
     def update_pheromone_matrix(self, ant_rank, evaporation_constant=0.01):
         # para cada formiga na lista de elite
         for ant in ant_rank:
-            # para cada cluster
-            for i in range(self.number_of_clusters):
-                # para cada objeto do cluster
-                for obj in ant.clusters[i].data_object_list:
-                    # atualiza a matriz de feromonio
-                    self.matrix[obj][i] = self.matrix[obj][i]*(1-evaporation_constant) + 1/ant.evaluate_solution()
+            # o custo da formiga é o mesmo para todos os objetos
+            pheromone = 1/ant.evaluate_solution()
+            order, labels = ant.assignment()
+            # atualiza, de uma vez, a celula de cada objeto no cluster em que a formiga o colocou
+            self.matrix[order, labels] = self.matrix[order, labels]*(1-evaporation_constant) + pheromone
 
 class Cluster:
     def __init__(self, 
                  id: int, 
-                 data_object_list: list):
+                 data_object_list: list, 
+                 index_list: np.ndarray=None):
         self.id = id
         self.data_object_list = data_object_list
+        # indices dos objetos na data_object_list do grafo, quando o cluster vem de uma formiga
+        self.index_list = index_list
+
+        # soma e quantidade dos objetos do cluster, o centro é atualizado a cada objeto adicionado sem percorrer os demais
+        self.count = len(self.data_object_list)
+        self.sum = np.sum([obj.data for obj in self.data_object_list], axis=0, dtype=np.float64) if self.data_object_list else None
         self.cluster_center = self.calculate_cluster_center()
 
     def calculate_cluster_center(self):
@@ -90,83 +209,167 @@ class Cluster:
             return center
         
         else:
-            for i in range(len(self.data_object_list[0].data)):
-                center.append(np.mean([obj.data[i] for obj in self.data_object_list]))
-            return center
+            return np.mean([obj.data for obj in self.data_object_list], axis=0, dtype=np.float64)
 
     def append_object(self, data_object):
         if not data_object.in_list(self.data_object_list):
             self.data_object_list.append(data_object)
-            self.cluster_center = self.calculate_cluster_center()
+            if self.sum is None:
+                self.sum = np.array(data_object.data, dtype=np.float64)
+            else:
+                self.sum = self.sum + data_object.data
+            self.count += 1
+            self.cluster_center = self.sum/self.count
         else:
             raise Exception("The object is already in the cluster")
         
+def cluster_probability(pheromone: np.ndarray, 
+                        distance: np.ndarray, 
+                        distance_expoent: float, 
+                        pheromone_expoent: float):
+    # avaliação de cada cluster para um objeto, pelo feromonio da linha do objeto e pela distancia até cada centro
+    pheromone = pheromone.astype(np.float64)
+    with np.errstate(divide='ignore'):
+        distance_inverse = 1/distance
+
+    # se o objeto coincide com algum centro, apenas esses clusters podem ser escolhidos
+    if np.isinf(distance_inverse).any():
+        return np.where(np.isinf(distance_inverse), pheromone**pheromone_expoent, 0)
+    return pheromone**pheromone_expoent * distance_inverse**distance_expoent
+
+def choose_cluster(probability_list: np.ndarray, 
+                   strategy: str, 
+                   rng: RandomStream):
+    probability_list = probability_list/probability_list.sum()
+
+    if strategy == 'greedy': # escolhe o cluster com maior probabilidade
+        return int(np.argmax(probability_list))
+
+    elif strategy == 'random': # escolhe o cluster aleatoriamente, com probabilidade proporcional a avaliação de cada cluster
+        cumulative_probability = np.cumsum(probability_list)
+        return min(int(np.searchsorted(cumulative_probability, rng.random()*cumulative_probability[-1], side='right')), len(probability_list) - 1)
+
+    else:
+        raise Exception("Invalid strategy")
+
 class Ant():
     def __init__ (self, 
                   graph: ACOCGraph, 
                   distance_expoent: float, 
-                  pheromone_expoent: float):
+                  pheromone_expoent: float, 
+                  rng: RandomStream=None):
         
         self.graph = graph
+        # gerador de numeros aleatorios, por padrão um novo RandomStream
+        self.rng = rng if rng is not None else RandomStream()
 
-        self.memory_list = []
-        self.object_list = self.graph.data_object_list.copy()
+        number_of_objects = self.graph.number_of_objects
+        number_of_clusters = self.graph.number_of_clusters
 
-        self.clusters = {}
+        if number_of_objects < number_of_clusters:
+            raise Exception("The number of objects must be at least the number of clusters")
 
-        # inicializa a formiga com um objeto aleatorio em cada cluster, para ser o centro do cluster
-        for i in range(self.graph.number_of_clusters):
-            
-            cluster = Cluster(i, [])
-            self.clusters[i] = cluster
+        # a ordem de visita dos objetos é sorteada uma unica vez e consumida do inicio para o fim,
+        # assim não é preciso procurar quais objetos ainda não foram visitados
+        self.order = self.rng.permutation(number_of_objects).astype(np.int64)
+        self.position = 0
 
-            possible_centers = []
+        # cluster de cada objeto (indice na data_object_list), -1 enquanto não foi visitado
+        self.labels = np.full(number_of_objects, -1, dtype=np.int64)
 
-            for obj in self.object_list:
-                if not obj.in_list(self.memory_list):
-                    possible_centers.append(obj)
+        # soma, quantidade e centro de cada cluster, atualizados a cada objeto adicionado
+        self.sums = np.zeros((number_of_clusters, self.graph.data.shape[1]), dtype=np.float64)
+        self.counts = np.zeros(number_of_clusters, dtype=np.int64)
+        self.centers = np.zeros((number_of_clusters, self.graph.data.shape[1]), dtype=np.float64)
+        self.cluster_cache = None
+        # custo da solução, calculado uma unica vez e descartado quando a formiga muda
+        self.cost = None
 
-            obj = random.choices(possible_centers)[0]
-
-            self.memory_list.append(obj)
-            self.clusters[i].append_object(obj)
+        # inicializa a formiga com um objeto aleatorio em cada cluster, para ser o centro do cluster
+        # os primeiros objetos da ordem de visita são os centros
+        for i in range(number_of_clusters):
+            self.assign(self.order[self.position], i)
+            self.position += 1
 
         self.distance_expoent = distance_expoent
         self.pheromone_expoent = pheromone_expoent
 
-    def move(self, strategy='random'): #strategy = 'greedy' or 'random'
-        
-        possible_destinations = []
+    @classmethod
+    def from_assignment(cls, 
+                        graph: ACOCGraph, 
+                        order: np.ndarray, 
+                        labels: np.ndarray, 
+                        distance_expoent: float, 
+                        pheromone_expoent: float):
+        # recria uma formiga a partir da ordem de visita dos objetos e do cluster de cada um, por exemplo vindos de outro processo
+        ant = cls.__new__(cls)
+        ant.graph = graph
+        # a formiga já está completa e não faz mais sorteios
+        ant.rng = None
+        ant.distance_expoent = distance_expoent
+        ant.pheromone_expoent = pheromone_expoent
+        ant.cluster_cache = None
+        ant.cost = None
 
-        for obj in self.object_list:
-            if not obj.in_list(self.memory_list):
-                possible_destinations.append(obj)
+        ant.order = np.asarray(order, dtype=np.int64)
+        ant.position = len(ant.order)
+        ant.labels = np.full(graph.number_of_objects, -1, dtype=np.int64)
+        ant.labels[ant.order] = labels
 
-        if len(possible_destinations) > 0:
-            
-            next_object = random.choices(possible_destinations)[0]
+        ant.sums = np.zeros((graph.number_of_clusters, graph.data.shape[1]), dtype=np.float64)
+        np.add.at(ant.sums, ant.labels[ant.order], graph.data[ant.order])
+        ant.counts = np.bincount(ant.labels[ant.order], minlength=graph.number_of_clusters)
+        ant.centers = ant.sums/np.maximum(ant.counts, 1)[:, np.newaxis]
 
-            probability_list = []
+        return ant
 
+    @property
+    def memory_list(self):
+        return [self.graph.data_object_list[i] for i in self.order[:self.position]]
+
+    @property
+    def object_list(self):
+        return self.graph.data_object_list
+
+    @property
+    def clusters(self):
+        # os clusters como instancias de Cluster, montados a partir dos indices apenas quando são pedidos
+        if self.cluster_cache is None:
+            visited = self.order[:self.position]
+            self.cluster_cache = {}
             for i in range(self.graph.number_of_clusters):
+                index_list = visited[self.labels[visited] == i]
+                self.cluster_cache[i] = Cluster(i, [self.graph.data_object_list[index] for index in index_list], index_list)
+        return self.cluster_cache
+
+    def assignment(self):
+        # ordem de visita (indices na data_object_list) e cluster de cada objeto visitado
+        order = self.order[:self.position]
+        return order.astype(np.int32), self.labels[order].astype(np.int32)
 
-                pheromone = self.graph.matrix[next_object][i]
-                distance = euclidean_distance(next_object.data, self.clusters[i].calculate_cluster_center())
+    def compact_solution(self):
+        # cluster de cada objeto, na ordem da data_object_list
+        return self.labels.astype(np.int32)
 
-                probability = pheromone**self.pheromone_expoent * (1/distance)**self.distance_expoent
-                probability_list.append(probability)
+    def assign(self, index: int, cluster: int):
+        self.labels[index] = cluster
+        self.sums[cluster] += self.graph.data[index]
+        self.counts[cluster] += 1
+        self.centers[cluster] = self.sums[cluster]/self.counts[cluster]
+        self.cluster_cache = None
+        self.cost = None
+
+    def move(self, strategy='random'): #strategy = 'greedy' or 'random'
 
-            probability_list = [p/sum(probability_list) for p in probability_list]
- 
-            if strategy == 'greedy': # escolhe o cluster com maior probabilidade
-                cluster = probability_list.index(max(probability_list))
-                self.clusters[cluster].append_object(next_object)
-                
-            elif strategy == 'random': # escolhe o cluster aleatoriamente, com probabilidade proporcional a avaliação de cada cluster
-                cluster = random.choices(range(self.graph.number_of_clusters), weights=probability_list)[0]
-                self.clusters[cluster].append_object(next_object)
+        if self.position < len(self.order):
+            
+            next_index = self.order[self.position]
+            # distancia do objeto para todos os centros de uma vez
+            probability_list = cluster_probability(self.graph.matrix[next_index], euclidean_distance(self.graph.data[next_index], self.centers), self.distance_expoent, self.pheromone_expoent)
+            cluster = choose_cluster(probability_list, strategy, self.rng)
 
-            self.memory_list.append(next_object)
+            self.assign(next_index, cluster)
+            self.position += 1
 
             # se a formiga se moveu retorna True
             return True
@@ -177,17 +380,247 @@ class Ant():
             return False
         
     def evaluate_solution(self):
+        # o custo usa a distancia (não ao quadrado) até o centro final de cada cluster, que muda a cada objeto adicionado,
+        # então é calculado uma vez com a formiga completa e reaproveitado nas chamadas seguintes
+        if self.cost is None:
+            self.cost = self.calculate_cost()
+        return self.cost
+
+    def calculate_cost(self):
         # calcula o custo da solução
-        cost = 0
-        for cluster in self.clusters.values():
-            cost_cluster = 0
-            for obj in cluster.data_object_list:
-                cost_cluster += euclidean_distance(obj.data, cluster.cluster_center)
-            # divide o custo do cluster pelo numero de objetos no cluster
-            cost += cost_cluster/len(cluster.data_object_list)
+        # distancia de cada objeto visitado para o centro do seu cluster
+        visited = self.order[:self.position]
+        labels = self.labels[visited]
+        distance = euclidean_distance(self.graph.data[visited], self.centers[labels])
+        # divide o custo de cada cluster pelo numero de objetos no cluster
+        cost_cluster = np.bincount(labels, weights=distance, minlength=self.graph.number_of_clusters)/np.maximum(self.counts, 1)
         # custo é a soma da media dos custos de cada cluster
-        return cost
+        return float(cost_cluster.sum())
+        
+class ElitePool:
+    def __init__(self, 
+                 number_of_elite: int, 
+                 archive_size: int=1):
         
+        self.number_of_elite = number_of_elite
+        self.archive_size = archive_size
+
+        # arquivo com as melhores formigas de todas as épocas, o topo do heap é a pior delas: (-custo, ordem de chegada, formiga)
+        self.archive = []
+        self.counter = itertools.count()
+
+    def select(self, ant_list: list, costs: np.ndarray):
+        # seleciona as number_of_elite formigas de menor custo sem ordenar a geração inteira
+        costs = np.asarray(costs, dtype=np.float64)
+        number_of_elite = min(self.number_of_elite, len(ant_list))
+        elite_index = np.argpartition(costs, number_of_elite - 1)[:number_of_elite]
+        elite_index = elite_index[np.argsort(costs[elite_index], kind='stable')]
+
+        elite = [ant_list[i] for i in elite_index]
+        elite_costs = costs[elite_index]
+
+        for ant, cost in zip(elite, elite_costs.tolist()):
+            if not self.offer(ant, cost):
+                # as demais formigas de elite são piores, também não entram no arquivo
+                break
+
+        return elite, elite_costs
+
+    def offer(self, ant, cost: float):
+        # devolve True se a formiga entrou no arquivo
+        if len(self.archive) < self.archive_size:
+            heapq.heappush(self.archive, (-cost, next(self.counter), ant))
+            return True
+        elif cost < -self.archive[0][0]:
+            heapq.heapreplace(self.archive, (-cost, next(self.counter), ant))
+            return True
+        return False
+
+    def restore(self, ranking: list):
+        # recria o arquivo a partir de (formiga, custo), da melhor para a pior, por exemplo vindos de um checkpoint
+        self.archive = []
+        self.counter = itertools.count()
+        for ant, cost in ranking:
+            heapq.heappush(self.archive, (-cost, next(self.counter), ant))
+
+    @property
+    def ranking(self):
+        # formigas do arquivo, da melhor para a pior, com o seu custo
+        return [(ant, -cost) for cost, _, ant in sorted(self.archive, key=lambda item: (-item[0], item[1]))]
+
+    @property
+    def best(self):
+        if not self.archive:
+            return None
+        return self.ranking[0][0]
+
+def nearest_centers(data: np.ndarray, 
+                    centers: np.ndarray, 
+                    chunk_size: int=65536):
+    # centro mais proximo de cada objeto e a distancia até ele, um bloco de objetos por vez
+    labels = np.empty(len(data), dtype=np.int64)
+    distances = np.empty(len(data), dtype=np.float64)
+    for start in range(0, len(data), chunk_size):
+        chunk = np.asarray(data[start:start + chunk_size], dtype=np.float64)
+        distance = euclidean_distance(chunk[:, np.newaxis, :], centers[np.newaxis, :, :])
+        labels[start:start + chunk_size] = np.argmin(distance, axis=1)
+        distances[start:start + chunk_size] = distance[np.arange(len(chunk)), labels[start:start + chunk_size]]
+    return labels, distances
+
+class StreamingSolution:
+    def __init__(self, 
+                 graph: ACOCGraph, 
+                 labels: np.ndarray):
+        # solução mantida pelo StreamingACOC: o cluster de cada objeto, a soma e a quantidade de objetos de cada cluster
+        # e a distancia de cada objeto ao centro do seu cluster no momento em que foi atribuido a ele
+        # o custo usa a soma dessas distancias por cluster, atualizada a cada mudança, sem percorrer todos os objetos
+        self.graph = graph
+        self.reset(labels)
+
+    def reset(self, labels: np.ndarray):
+        # recalcula tudo a partir do cluster de cada objeto, com as distancias até os centros atuais (percorre todos os objetos)
+        number_of_clusters = self.graph.number_of_clusters
+        self.labels = np.asarray(labels, dtype=np.int64).copy()
+        self.sums = np.zeros((number_of_clusters, self.graph.data.shape[1]), dtype=np.float64)
+        for start in range(0, len(self.labels), 65536):
+            np.add.at(self.sums, self.labels[start:start + 65536], np.asarray(self.graph.data[start:start + 65536], dtype=np.float64))
+        self.counts = np.bincount(self.labels, minlength=number_of_clusters)
+
+        centers = self.centers
+        self.distances = np.concatenate([euclidean_distance(np.asarray(self.graph.data[start:start + 65536], dtype=np.float64), centers[self.labels[start:start + 65536]])
+                                         for start in range(0, len(self.labels), 65536)])
+        self.distance_sums = np.bincount(self.labels, weights=self.distances, minlength=number_of_clusters)
+
+    @property
+    def centers(self):
+        return self.sums/np.maximum(self.counts, 1)[:, np.newaxis]
+
+    def append(self, index: np.ndarray):
+        # novos objetos (index, no fim do grafo) entram no cluster do centro mais proximo
+        labels, distances = nearest_centers(self.graph.data[index], self.centers)
+        self.labels = self.graph.extend('labels', self.labels, labels)
+        self.distances = self.graph.extend('distances', self.distances, distances)
+        np.add.at(self.sums, labels, np.asarray(self.graph.data[index], dtype=np.float64))
+        self.counts += np.bincount(labels, minlength=self.graph.number_of_clusters)
+        self.distance_sums += np.bincount(labels, weights=distances, minlength=self.graph.number_of_clusters)
+        return labels
+
+    def commit(self, ant):
+        # adota as atribuições de uma BatchAnt, que só mudou os objetos do seu lote
+        order, labels = ant.assignment()
+        self.labels[order] = labels
+        self.distances[order] = ant.batch_distances
+        self.sums = ant.sums.copy()
+        self.counts = ant.counts.copy()
+        self.distance_sums = ant.distance_sums + np.bincount(labels, weights=ant.batch_distances, minlength=self.graph.number_of_clusters)
+
+    def evaluate_solution(self):
+        # mesmo custo da Ant: soma da media das distancias de cada cluster
+        return float((self.distance_sums/np.maximum(self.counts, 1)).sum())
+
+    def assignment(self):
+        return np.arange(len(self.labels), dtype=np.int32), self.labels.astype(np.int32)
+
+    def compact_solution(self):
+        return self.labels.astype(np.int32)
+
+class BatchAnt:
+    def __init__(self, 
+                 graph: ACOCGraph, 
+                 solution: StreamingSolution, 
+                 batch: np.ndarray, 
+                 distance_expoent: float, 
+                 pheromone_expoent: float, 
+                 rng: RandomStream=None):
+        # formiga do StreamingACOC: parte da solução atual e reatribui apenas os objetos de batch, em ordem aleatoria
+        # o custo de construir e avaliar a formiga depende do tamanho do lote, não do numero de objetos
+        self.graph = graph
+        self.rng = rng if rng is not None else RandomStream()
+        self.distance_expoent = distance_expoent
+        self.pheromone_expoent = pheromone_expoent
+
+        # os objetos do lote saem dos seus clusters antes de serem reatribuidos
+        labels = solution.labels[batch]
+        data = np.asarray(self.graph.data[batch], dtype=np.float64)
+        self.sums = solution.sums.copy()
+        np.subtract.at(self.sums, labels, data)
+        self.counts = solution.counts - np.bincount(labels, minlength=graph.number_of_clusters)
+        self.distance_sums = solution.distance_sums - np.bincount(labels, weights=solution.distances[batch], minlength=graph.number_of_clusters)
+
+        self.order = batch[self.rng.permutation(len(batch))].astype(np.int64)
+        self.position = 0
+        self.labels = np.full(len(batch), -1, dtype=np.int64)
+        self.batch_distances = None
+        self.cost = None
+
+    def move(self, strategy='random'):
+        if self.position == len(self.order):
+            return False
+
+        next_index = self.order[self.position]
+        data = np.asarray(self.graph.data[next_index], dtype=np.float64)
+
+        # um cluster que ficou vazio recebe o proximo objeto, como os centros iniciais da Ant
+        empty = np.flatnonzero(self.counts == 0)
+        if len(empty):
+            cluster = int(empty[0])
+        else:
+            centers = self.sums/self.counts[:, np.newaxis]
+            cluster = choose_cluster(cluster_probability(self.graph.matrix[next_index], euclidean_distance(data, centers), self.distance_expoent, self.pheromone_expoent), strategy, self.rng)
+
+        self.labels[self.position] = cluster
+        self.sums[cluster] += data
+        self.counts[cluster] += 1
+        self.position += 1
+        return True
+
+    def assignment(self):
+        return self.order[:self.position].astype(np.int32), self.labels[:self.position].astype(np.int32)
+
+    def evaluate_solution(self):
+        # os objetos do lote usam a distancia até os centros finais, os demais a distancia guardada na solução
+        if self.cost is None:
+            centers = self.sums/np.maximum(self.counts, 1)[:, np.newaxis]
+            self.batch_distances = euclidean_distance(np.asarray(self.graph.data[self.order], dtype=np.float64), centers[self.labels])
+            distance_sums = self.distance_sums + np.bincount(self.labels, weights=self.batch_distances, minlength=self.graph.number_of_clusters)
+            self.cost = float((distance_sums/np.maximum(self.counts, 1)).sum())
+        return self.cost
+
+# estado de cada processo de trabalho, preenchido uma unica vez na criação do pool
+worker_state = {}
+
+def init_construction_worker(graph: ACOCGraph, 
+                             shared_name: str, 
+                             shape: tuple, 
+                             distance_expoent: float, 
+                             pheromone_expoent: float, 
+                             strategy: str, 
+                             entropy: int):
+    # a matriz de feromonio do processo passa a ser a da memoria compartilhada, atualizada pelo processo principal a cada época
+    worker_state['shared_pheromone'] = SharedArray(shape, dtype=graph.matrix.dtype, name=shared_name)
+    graph.matrix = worker_state['shared_pheromone'].array
+    worker_state['graph'] = graph
+    worker_state['parameters'] = (distance_expoent, pheromone_expoent, strategy)
+    worker_state['entropy'] = entropy
+
+def construct_assignments(tasks: list):
+    # tasks é uma lista de chaves do gerador de cada formiga, devolve a ordem de visita e o cluster de cada objeto
+    graph = worker_state['graph']
+    distance_expoent, pheromone_expoent, strategy = worker_state['parameters']
+    assignments = []
+
+    for keys in tasks:
+        ant = Ant(graph, distance_expoent, pheromone_expoent, rng=random_stream(worker_state['entropy'], *keys))
+        keep_moving = True
+        while keep_moving:
+            keep_moving = ant.move(strategy=strategy)
+        assignments.append(ant.assignment())
+
+    return assignments
+
+# fases de cada época, usadas nos tempos acumulados de ACOC.timings
+PHASES = ('construction', 'evaluation', 'update', 'history')
+
 class ACOC():
     def __init__ (self, 
                   graph: ACOCGraph, 
@@ -198,7 +631,14 @@ class ACOC():
                   pheromone_expoent: float, 
                   number_of_elite: int, 
                   evaporation_constant: float, 
-                  strategy:str='greedy'):
+                  strategy:str='greedy', 
+                  workers:int=None, 
+                  seed:int=None, 
+                  history:str='full', 
+                  keep_best:int=1, 
+                  archive_size:int=1, 
+                  callbacks:list=None, 
+                  autorun:bool=True):
         
         self.graph = graph
         self.number_of_epochs = number_of_epochs
@@ -210,60 +650,347 @@ class ACOC():
         self.evaporation_constant = evaporation_constant
         self.better_solution = None
         self.strategy = strategy
+
+        # seleciona a elite de cada época e guarda as archive_size melhores formigas de todas as épocas
+        self.elite_pool = ElitePool(self.number_of_elite, archive_size)
         self.last_generation = []
-        self.epochs_dict = {}
 
-        self.run()
+        # tempo acumulado (em segundos) de cada fase das épocas
+        self.timings = dict.fromkeys(PHASES, 0.0)
 
-    def run(self):
-        
-        for i in range(self.number_of_epochs):
+        # history = 'full' guarda o ranking de elite de cada época em epochs_dict, como antes
+        # history = 'best' guarda apenas o resumo de cada época e as keep_best melhores soluções como arrays com o cluster de cada objeto
+        # history = 'summary' guarda apenas o melhor, a média e o pior custo de cada época
+        self.history = History(history, number_of_epochs, keep_best)
+        self.epochs_dict = self.history.epochs_dict
 
-            ant_list = []
+        # com workers, as formigas de cada época são construidas em um pool de processos
+        # cada execução tem sua propria SeedSequence, e cada formiga um gerador filho, derivado da época e do seu indice,
+        # assim varias execuções podem rodar no mesmo processo sem interferir e o resultado não depende do numero de processos
+        # sem semente, a entropia é sorteada pelo numpy e fica em entropy
+        self.workers = workers
+        self.seed = seed
+        self.entropy = np.random.SeedSequence(seed).entropy
 
-            for _ in range(self.number_of_ant):
+        self.pool = None
+        self.shared_pheromone = None
 
-                ant_list.append(Ant(self.graph, self.distance_expoent, self.pheromone_expoent))
+        # numero de épocas já executadas
+        self.epoch = 0
 
-            for ant in ant_list:
-                keep_moving = True
-                while keep_moving:
-                    keep_moving = ant.move(strategy=self.strategy)
-            
-            ant_rank = pd.DataFrame(data=[[ant, ant.evaluate_solution()] for ant in ant_list], columns=['ant', 'cost'])
-            ant_rank = ant_rank.sort_values(by='cost', ascending=True, ignore_index=True)
+        # callbacks (ver callbacks.py) chamados ao fim de cada época, podem interromper a execução
+        # com autorun=False o construtor apenas prepara o algoritmo, e a execução é feita chamando run
+        self.callbacks = callbacks if callbacks is not None else []
+        self.stopped_by = None
+        self.interrupted = False
 
-            ant_rank = ant_rank.head(self.number_of_elite)
+        if autorun:
+            self.run()
 
-            if self.better_solution is None:
-                self.better_solution = ant_rank['ant'][0]
-            
-            elif ant_rank['cost'][0] < self.better_solution.evaluate_solution():
-                self.better_solution = ant_rank['ant'][0]
+    def run(self, 
+            number_of_epochs: int=None, 
+            callbacks: list=None):
+        # executa number_of_epochs épocas (por padrão, as do construtor) a partir da ultima época executada
+        # a execução termina antes se algum callback devolver True, e o callback fica em stopped_by
+        # se a execução terminar com uma exceção (inclusive KeyboardInterrupt), interrupted fica True durante on_run_end
+        if number_of_epochs is None:
+            number_of_epochs = self.number_of_epochs
+        if callbacks is None:
+            callbacks = self.callbacks
+        self.stopped_by = None
+
+        if self.workers is not None and self.workers > 1:
+            self.start_workers()
+
+        for callback in callbacks:
+            callback.on_run_start(self)
+
+        start = time.perf_counter()
+
+        self.interrupted = True
+        try:
+            for _ in range(number_of_epochs):
+                timings = self.run_epoch(self.epoch)
+                self.epoch += 1
+
+                metrics = {'epoch':self.epoch,
+                           'timings':timings,
+                           'iteration_best_cost':float(self.history.best_costs[-1]),
+                           'mean_cost':float(self.history.mean_costs[-1]),
+                           'best_cost':float(self.better_solution.evaluate_solution()),
+                           'elapsed':time.perf_counter() - start}
+
+                # todos os callbacks são chamados, mesmo quando um deles pede a interrupção
+                stop = [callback for callback in callbacks if callback.on_epoch_end(self, metrics)]
+                if stop:
+                    self.stopped_by = stop[0]
+                    break
+            self.interrupted = False
+        finally:
+            self.stop_workers()
+            for callback in callbacks:
+                callback.on_run_end(self)
+
+    def ant_rng(self, epoch: int, index: int):
+        return random_stream(self.entropy, epoch, index)
+
+    def construct_generation(self, epoch: int):
+        if self.pool is not None:
+            # a matriz de feromonio da época é copiada para a memoria compartilhada, os processos recebem apenas as chaves do gerador de cada formiga
+            np.copyto(self.shared_pheromone.array, self.graph.matrix)
+
+            tasks = [(epoch, index) for index in range(self.number_of_ant)]
+            assignments = [assignment for chunk in self.pool.map(construct_assignments, split(tasks, self.workers)) for assignment in chunk]
+
+            return [Ant.from_assignment(self.graph, order, labels, self.distance_expoent, self.pheromone_expoent) for order, labels in assignments]
+
+        ant_list = []
+
+        for index in range(self.number_of_ant):
+
+            ant_list.append(Ant(self.graph, self.distance_expoent, self.pheromone_expoent, rng=self.ant_rng(epoch, index)))
+
+        for ant in ant_list:
+            keep_moving = True
+            while keep_moving:
+                keep_moving = ant.move(strategy=self.strategy)
+
+        return ant_list
+
+    def start_workers(self):
+        self.shared_pheromone = SharedArray(self.graph.matrix.shape, dtype=self.graph.matrix.dtype)
+        self.pool = create_pool(self.workers, init_construction_worker, (self.graph, self.shared_pheromone.name, self.shared_pheromone.shape, self.distance_expoent, self.pheromone_expoent, self.strategy, self.entropy))
+
+    def stop_workers(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+        if self.shared_pheromone is not None:
+            self.shared_pheromone.close()
+            self.shared_pheromone = None
+
+    def parameters(self):
+        # parametros que precisam ser os mesmos para continuar uma execução a partir de um checkpoint
+        return {'number_of_objects':self.graph.number_of_objects,
+                'number_of_clusters':self.number_of_clusters,
+                'number_of_ant':self.number_of_ant,
+                'distance_expoent':self.distance_expoent,
+                'pheromone_expoent':self.pheromone_expoent,
+                'number_of_elite':self.number_of_elite,
+                'evaporation_constant':self.evaporation_constant,
+                'strategy':self.strategy,
+                'archive_size':self.elite_pool.archive_size,
+                'seed':self.seed}
+
+    def save_checkpoint(self, path: str):
+        # grava a matriz de feromonio, o arquivo de melhores formigas (que pode estar vazio, antes da primeira época), a época, o estado do gerador aleatorio e o histórico
+        # em um .npz (ver checkpoint.py); as formigas são guardadas apenas como a ordem de visita e o cluster de cada objeto
+        ranking = self.elite_pool.ranking
+        assignments = [ant.assignment() for ant, _ in ranking]
+
+        arrays = {'pheromone':self.graph.matrix,
+                  'archive_costs':np.array([cost for _, cost in ranking], dtype=np.float64),
+                  'archive_orders':np.array([order for order, _ in assignments], dtype=np.int32).reshape(len(ranking), self.graph.number_of_objects),
+                  'archive_labels':np.array([labels for _, labels in assignments], dtype=np.int32).reshape(len(ranking), self.graph.number_of_objects)}
+        metadata = {'algorithm':'acoc',
+                    'epoch':self.epoch,
+                    'parameters':self.parameters()}
+
+        # os geradores das formigas são derivados da entropia da execução e da época
+        metadata['entropy'] = self.entropy
+
+        for key, value in self.history.state().items():
+            arrays['history_' + key] = value
+
+        save_checkpoint(path, arrays, metadata)
+
+    def load_checkpoint(self, path: str):
+        # restaura o estado gravado por save_checkpoint; a instancia deve ter sido criada com os mesmos parametros (e autorun=False)
+        # depois disso, run continua a execução a partir da época gravada
+        arrays, metadata = load_checkpoint(path)
+        if metadata['algorithm'] != 'acoc':
+            raise Exception("Error: The checkpoint was not created by ACOC")
+        check_parameters(metadata['parameters'], self.parameters())
+
+        self.graph.matrix[...] = arrays['pheromone']
+        self.epoch = metadata['epoch']
+        self.last_generation = []
+
+        ranking = [(Ant.from_assignment(self.graph, order, labels, self.distance_expoent, self.pheromone_expoent), cost)
+                   for order, labels, cost in zip(arrays['archive_orders'], arrays['archive_labels'], arrays['archive_costs'].tolist())]
+        self.elite_pool.restore(ranking)
+        self.better_solution = self.elite_pool.best
 
-            self.graph.update_pheromone_matrix(ant_rank['ant'], evaporation_constant=self.evaporation_constant)
+        self.entropy = metadata['entropy']
 
-            self.last_generation = ant_rank['ant']
-            self.epochs_dict[i] = ant_rank
+        self.history.load_state({key[len('history_'):]:value for key, value in arrays.items() if key.startswith('history_')})
+
+    def accept_migrant(self, labels: np.ndarray):
+        # recebe a solução de outra colonia (ver island.py), como o cluster de cada objeto: ela pode entrar no arquivo
+        # de melhores formigas e deposita feromonio como uma formiga de elite
+        migrant = Ant.from_assignment(self.graph, np.arange(self.graph.number_of_objects), labels, self.distance_expoent, self.pheromone_expoent)
+        self.elite_pool.offer(migrant, migrant.evaluate_solution())
+        self.better_solution = self.elite_pool.best
+        self.graph.update_pheromone_matrix([migrant], evaporation_constant=self.evaporation_constant)
+
+    def run_epoch(self, i: int):
+        # executa a época i e devolve o tempo de cada fase, que também é somado em timings
+        timings = dict.fromkeys(PHASES, 0.0)
+
+        start = time.perf_counter()
+        ant_list = self.construct_generation(i)
+        timings['construction'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        costs = np.array([ant.evaluate_solution() for ant in ant_list])
+        elite, elite_costs = self.elite_pool.select(ant_list, costs)
+
+        # a melhor formiga de todas as épocas é a melhor do arquivo
+        self.better_solution = self.elite_pool.best
+        timings['evaluation'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        self.graph.update_pheromone_matrix(elite, evaporation_constant=self.evaporation_constant)
+        timings['update'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        self.last_generation = elite
+        self.history.record(i, costs, lambda index: ant_list[index].compact_solution(), {'ant':elite, 'cost':elite_costs})
+        timings['history'] = time.perf_counter() - start
+
+        for phase, seconds in timings.items():
+            self.timings[phase] += seconds
+
+        return timings
+
+class StreamingACOC(ACOC):
+    def __init__ (self, 
+                  graph: ACOCGraph, 
+                  number_of_epochs: int,
+                  number_of_clusters: int, 
+                  number_of_ant: int, 
+                  distance_expoent: float, 
+                  pheromone_expoent: float, 
+                  number_of_elite: int, 
+                  evaporation_constant: float, 
+                  batch_size: int=256, 
+                  strategy:str='greedy', 
+                  seed:int=None, 
+                  history:str='summary', 
+                  callbacks:list=None, 
+                  autorun:bool=True):
+
+        # ACOC para dados que chegam aos poucos: a solução atual (better_solution, uma StreamingSolution) é mantida entre as épocas,
+        # e em cada época as formigas reatribuem apenas um lote de batch_size objetos sorteados mais os objetos novos
+        # os objetos novos são acrescentados com partial_fit; o custo de cada época depende do tamanho do lote, não do total de objetos
+        # as formigas são construidas no processo atual; o histórico guarda apenas os custos
+        # a matriz de feromonio e a solução ficam em memoria (uma linha de number_of_clusters valores por objeto); com data
+        # mapeado em memoria, os objetos acrescentados vão para um .npy mapeado ao lado do arquivo (ver ACOCGraph.allocate_buffer)
+        super().__init__(graph, number_of_epochs, number_of_clusters, number_of_ant, distance_expoent, pheromone_expoent, number_of_elite, evaporation_constant,
+                         strategy=strategy, seed=seed, history=history, callbacks=callbacks, autorun=False)
+        self.batch_size = batch_size
+
+        # solução inicial: number_of_clusters objetos sorteados como centros e cada objeto no centro mais proximo
+        if graph.number_of_objects < number_of_clusters:
+            raise Exception("The number of objects must be at least the number of clusters")
+        centers = np.asarray(graph.data[np.sort(random_stream(self.entropy).sample(graph.number_of_objects, number_of_clusters))], dtype=np.float64)
+        self.better_solution = StreamingSolution(graph, nearest_centers(graph.data, centers)[0])
+
+        # objetos acrescentados desde a ultima época, entram no lote da proxima época
+        self.arrivals = np.zeros(0, dtype=np.int64)
+
+        if autorun:
+            self.run()
+
+    def partial_fit(self, 
+                    data: np.ndarray, 
+                    target: np.ndarray=None, 
+                    number_of_epochs: int=1, 
+                    callbacks: list=None):
+        # acrescenta os novos objetos e executa number_of_epochs épocas
+        # cada novo objeto entra no cluster do centro mais proximo, e a sua linha de feromonio recebe nesse cluster
+        # o deposito de uma formiga de elite com o custo da solução atual
+        index = self.graph.append_objects(data, target)
+        labels = self.better_solution.append(index)
+        self.graph.matrix[index, labels] += 1/self.better_solution.evaluate_solution()
+        self.arrivals = np.concatenate([self.arrivals, index])
+
+        self.run(number_of_epochs, callbacks)
+        return self
+
+    def sample_batch(self, epoch: int):
+        # os objetos novos mais batch_size objetos sorteados, sem repetição
+        sample = random_stream(self.entropy, epoch).sample(self.graph.number_of_objects, self.batch_size)
+        return np.union1d(self.arrivals, sample)
+
+    def construct_generation(self, epoch: int):
+        batch = self.sample_batch(epoch)
+        ant_list = [BatchAnt(self.graph, self.better_solution, batch, self.distance_expoent, self.pheromone_expoent, rng=self.ant_rng(epoch, index)) for index in range(self.number_of_ant)]
+
+        for ant in ant_list:
+            keep_moving = True
+            while keep_moving:
+                keep_moving = ant.move(strategy=self.strategy)
+
+        return ant_list
+
+    def run_epoch(self, i: int):
+        # executa a época i e devolve o tempo de cada fase, que também é somado em timings
+        timings = dict.fromkeys(PHASES, 0.0)
+
+        start = time.perf_counter()
+        ant_list = self.construct_generation(i)
+        timings['construction'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        costs = np.array([ant.evaluate_solution() for ant in ant_list])
+        number_of_elite = min(self.number_of_elite, len(ant_list))
+        elite_index = np.argsort(costs, kind='stable')[:number_of_elite]
+        elite = [ant_list[index] for index in elite_index]
+
+        # a melhor formiga só substitui a solução atual se a melhorar
+        if costs[elite_index[0]] < self.better_solution.evaluate_solution():
+            self.better_solution.commit(elite[0])
+        self.arrivals = np.zeros(0, dtype=np.int64)
+        timings['evaluation'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        self.graph.update_pheromone_matrix(elite, evaporation_constant=self.evaporation_constant)
+        timings['update'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        self.last_generation = elite
+        self.history.record(i, costs, None, {'cost':costs[elite_index]})
+        timings['history'] = time.perf_counter() - start
+
+        for phase, seconds in timings.items():
+            self.timings[phase] += seconds
+
+        return timings
+
+    def accept_migrant(self, labels: np.ndarray):
+        # a solução recebida substitui a atual se for melhor, e deposita feromonio em todos os objetos
+        migrant = StreamingSolution(self.graph, labels)
+        if migrant.evaluate_solution() < self.better_solution.evaluate_solution():
+            self.better_solution = migrant
+        self.graph.update_pheromone_matrix([migrant], evaporation_constant=self.evaporation_constant)
+
+    def save_checkpoint(self, path: str):
+        raise Exception("Error: Checkpoints are not supported by StreamingACOC")
+
+    def load_checkpoint(self, path: str):
+        raise Exception("Error: Checkpoints are not supported by StreamingACOC")
 
 if __name__ == "__main__":
+    from loader import load_array
 
-    dataset = pd.read_csv('dataset/wine.csv', sep=',', header=None)
-    target = dataset[0]
-    data = dataset.drop([0], axis=1)
-    # normalizando os dados, dividindo pelo maior valor de cada coluna
-    for col in data.columns:
-        scaled_values = [value/max(data[col]) for value in data[col]]
-        data[col] = scaled_values
-    data_list = data.values.tolist()
-    data_object_list = []
-    
-    for i in range(len(data_list)):
-        data_object_list.append(DataObject(id=i, data=data_list[i], target=target[i]))
+    # a primeira coluna é a classe; os dados são normalizados dividindo pelo maior valor de cada coluna
+    data, target = load_array('dataset/wine.csv', target_column=0, normalization='max')
 
-    graph = ACOCGraph(data_object_list, number_of_clusters=3, initial_pheromone=0.1)
+    graph = ACOCGraph(data=data, target=target, number_of_clusters=3, initial_pheromone=0.1)
 
-    NUMBER_OF_ANT = int(round(len(data_object_list)*0.05,0))
+    NUMBER_OF_ANT = int(round(graph.number_of_objects*0.05,0))
     NUMBER_OF_ELITE = int(round(NUMBER_OF_ANT*0.2))
 
     print("numero de formigas: {}".format(NUMBER_OF_ANT))
@@ -276,7 +1003,8 @@ if __name__ == "__main__":
                 distance_expoent=1, 
                 pheromone_expoent=1, 
                 number_of_elite=NUMBER_OF_ELITE, 
-                evaporation_constant=0.01)
+                evaporation_constant=0.01, 
+                seed=42)
 
     print("melhor avaliação: {}".format(acoc.better_solution.evaluate_solution()))
     print("\n")
@@ -0,0 +1,320 @@
+import argparse
+import json
+import time
+import tracemalloc
+import numpy as np
+from aco import ACO
+from acoc import ACOC, ACOCGraph, Ant
+
+# comprimento do caminho otimo das instancias mais usadas da TSPLIB
+KNOWN_OPTIMA = {
+    'burma14':3323, 'ulysses16':6859, 'gr17':2085, 'ulysses22':7013, 'gr24':1272,
+    'bays29':2020, 'att48':10628, 'eil51':426, 'berlin52':7542, 'st70':675,
+    'eil76':538, 'pr76':108159, 'kroA100':21282, 'kroB100':22141, 'eil101':629,
+    'lin105':14379, 'ch130':6110, 'ch150':6528, 'kroA200':29368, 'a280':2579,
+}
+
+def nint(x):
+    return np.floor(np.asarray(x) + 0.5)
+
+def geo_radians(coordinates:np.ndarray):
+    # coordenadas GEO da TSPLIB: graus e minutos no formato DDD.MM
+    degrees = np.trunc(coordinates)
+    return np.pi*(degrees + 5.0*(coordinates - degrees)/3.0)/180.0
+
+def tsplib_distances(coordinates:np.ndarray, edge_weight_type:str):
+    # matriz de distancias inteiras, calculadas como definido na TSPLIB, para comparar com os otimos conhecidos
+    if edge_weight_type == 'GEO':
+        radians = geo_radians(coordinates)
+        latitude, longitude = radians[:, 0], radians[:, 1]
+        q1 = np.cos(longitude[:, np.newaxis] - longitude[np.newaxis, :])
+        q2 = np.cos(latitude[:, np.newaxis] - latitude[np.newaxis, :])
+        q3 = np.cos(latitude[:, np.newaxis] + latitude[np.newaxis, :])
+        distance = np.floor(6378.388*np.arccos(0.5*((1.0 + q1)*q2 - (1.0 - q1)*q3)) + 1.0)
+    else:
+        euclidean = np.zeros((len(coordinates), len(coordinates)))
+        for dimension in range(coordinates.shape[1]):
+            euclidean += np.square(np.subtract.outer(coordinates[:, dimension], coordinates[:, dimension]))
+
+        if edge_weight_type == 'EUC_2D':
+            distance = nint(np.sqrt(euclidean))
+        elif edge_weight_type == 'CEIL_2D':
+            distance = np.ceil(np.sqrt(euclidean))
+        elif edge_weight_type == 'ATT':
+            pseudo = np.sqrt(euclidean/10.0)
+            distance = nint(pseudo)
+            distance[distance < pseudo] += 1
+        else:
+            raise Exception("Error: Unsupported edge weight type {}".format(edge_weight_type))
+
+    np.fill_diagonal(distance, 0)
+    return distance
+
+def explicit_distances(weights:list, dimension:int, edge_weight_format:str):
+    distance = np.zeros((dimension, dimension))
+    weights = iter(weights)
+
+    if edge_weight_format == 'FULL_MATRIX':
+        cells = ((i, j) for i in range(dimension) for j in range(dimension))
+    elif edge_weight_format == 'UPPER_ROW':
+        cells = ((i, j) for i in range(dimension) for j in range(i + 1, dimension))
+    elif edge_weight_format == 'LOWER_ROW':
+        cells = ((i, j) for i in range(dimension) for j in range(i))
+    elif edge_weight_format == 'UPPER_DIAG_ROW':
+        cells = ((i, j) for i in range(dimension) for j in range(i, dimension))
+    elif edge_weight_format == 'LOWER_DIAG_ROW':
+        cells = ((i, j) for i in range(dimension) for j in range(i + 1))
+    else:
+        raise Exception("Error: Unsupported edge weight format {}".format(edge_weight_format))
+
+    for i, j in cells:
+        distance[i, j] = next(weights)
+        if edge_weight_format != 'FULL_MATRIX':
+            distance[j, i] = distance[i, j]
+
+    return distance
+
+def read_tsplib(path:str):
+    # le uma instancia da TSPLIB (EUC_2D, CEIL_2D, ATT, GEO ou EXPLICIT)
+    # devolve um dict com name, dimension, coordinates (None nas instancias EXPLICIT), distance_matrix e optimum (None se não for conhecido)
+    specification = {}
+    coordinates = []
+    weights = []
+    section = None
+
+    with open(path) as file:
+        for line in file:
+            line = line.strip()
+            if not line or line == 'EOF':
+                continue
+
+            keyword = line.split(':')[0].strip()
+            if keyword.endswith('_SECTION'):
+                section = keyword
+            elif ':' in line:
+                key, value = line.split(':', 1)
+                specification[key.strip()] = value.strip()
+                section = None
+            elif section == 'NODE_COORD_SECTION':
+                coordinates.append([float(value) for value in line.split()[1:]])
+            elif section == 'EDGE_WEIGHT_SECTION':
+                weights.extend(float(value) for value in line.split())
+
+    dimension = int(specification['DIMENSION'])
+    edge_weight_type = specification.get('EDGE_WEIGHT_TYPE', 'EUC_2D')
+    name = specification.get('NAME', path)
+
+    if edge_weight_type == 'EXPLICIT':
+        distance_matrix = explicit_distances(weights, dimension, specification.get('EDGE_WEIGHT_FORMAT', 'FULL_MATRIX'))
+        coordinates = None
+    else:
+        coordinates = np.array(coordinates, dtype=np.float64)
+        distance_matrix = tsplib_distances(coordinates, edge_weight_type)
+
+    return {'name':name,
+            'dimension':dimension,
+            'coordinates':coordinates,
+            'distance_matrix':distance_matrix,
+            'optimum':KNOWN_OPTIMA.get(name)}
+
+def random_instance(number_of_vertex:int, seed:int=0):
+    # instancia com vertices uniformes no quadrado [0, 1000]², sem otimo conhecido
+    coordinates = np.random.default_rng(seed).uniform(0, 1000, size=(number_of_vertex, 2))
+    return {'name':'random{}'.format(number_of_vertex),
+            'dimension':number_of_vertex,
+            'coordinates':coordinates,
+            'distance_matrix':None,
+            'optimum':None}
+
+def gaussian_blobs(number_of_objects:int, number_of_dimensions:int, number_of_clusters:int, spread:float=1.0, seed:int=0):
+    # objetos sorteados em torno de number_of_clusters centros, devolve os dados e o cluster de origem de cada objeto
+    rng = np.random.default_rng(seed)
+    centers = rng.uniform(-10, 10, size=(number_of_clusters, number_of_dimensions))
+    target = rng.integers(number_of_clusters, size=number_of_objects)
+    data = centers[target] + rng.normal(scale=spread, size=(number_of_objects, number_of_dimensions))
+    return data, target
+
+def measure(function):
+    # executa function uma vez medindo o tempo e outra medindo o pico de memoria,
+    # o tracemalloc deixa a execução mais lenta e não é usado na medida de tempo
+    start = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return result, elapsed, peak
+
+def instance_arguments(instance:dict, engine:str='object'):
+    # vertex_list, distance_dict, distance_matrix e coordinates do ACO para a instancia, conforme o engine
+    vertex_list = list(range(instance['dimension']))
+    distance_matrix = instance['distance_matrix']
+    coordinates = instance['coordinates']
+
+    # o engine 'sparse' usa as coordenadas, os demais a matriz de distancias da instancia quando ela existe
+    distance_dict = None
+    if engine == 'sparse':
+        distance_matrix = None
+    else:
+        if distance_matrix is not None:
+            coordinates = None
+        if engine == 'object':
+            if distance_matrix is None:
+                distance_matrix = tsplib_distances(coordinates, 'EUC_2D')
+            distance_dict = {i:{j:distance_matrix[i, j] for j in vertex_list if j != i} for i in vertex_list}
+            distance_matrix, coordinates = None, None
+
+    return {'vertex_list':vertex_list,
+            'distance_dict':distance_dict,
+            'distance_matrix':distance_matrix,
+            'coordinates':coordinates}
+
+def benchmark_aco(instance:dict, number_of_epochs:int=20, **parameters):
+    arguments = instance_arguments(instance, parameters.get('engine', 'object'))
+
+    def run():
+        return ACO(number_of_epochs=number_of_epochs,
+                   history='summary',
+                   **arguments,
+                   **parameters)
+
+    aco, elapsed, peak = measure(run)
+    cost = float(aco.best_ant.calculate_distance())
+
+    return {'algorithm':'aco',
+            'instance':instance['name'],
+            'size':instance['dimension'],
+            'epochs':number_of_epochs,
+            'seconds':elapsed,
+            'epochs_per_second':number_of_epochs/elapsed,
+            'timings':aco.timings,
+            'peak_memory_mb':peak/2**20,
+            'cost':cost,
+            'reference':instance['optimum'],
+            'gap':None if instance['optimum'] is None else cost/instance['optimum'] - 1}
+
+def benchmark_acoc(number_of_objects:int,
+                   number_of_dimensions:int=2,
+                   number_of_clusters:int=3,
+                   number_of_epochs:int=10,
+                   number_of_ant:int=10,
+                   number_of_elite:int=2,
+                   seed:int=0,
+                   **parameters):
+    data, target = gaussian_blobs(number_of_objects, number_of_dimensions, number_of_clusters, seed=seed)
+
+    def run():
+        graph = ACOCGraph(data=data, target=target, number_of_clusters=number_of_clusters)
+        return ACOC(graph,
+                    number_of_epochs=number_of_epochs,
+                    number_of_clusters=number_of_clusters,
+                    number_of_ant=number_of_ant,
+                    distance_expoent=1,
+                    pheromone_expoent=1,
+                    number_of_elite=number_of_elite,
+                    evaporation_constant=0.01,
+                    seed=seed,
+                    history='summary',
+                    **parameters)
+
+    acoc, elapsed, peak = measure(run)
+    cost = float(acoc.better_solution.evaluate_solution())
+
+    # a referencia é o custo dos clusters de origem dos objetos
+    order = np.arange(number_of_objects)
+    reference = float(Ant.from_assignment(acoc.graph, order, target, 1, 1).evaluate_solution())
+
+    return {'algorithm':'acoc',
+            'instance':'blobs{}x{}k{}'.format(number_of_objects, number_of_dimensions, number_of_clusters),
+            'size':number_of_objects,
+            'epochs':number_of_epochs,
+            'seconds':elapsed,
+            'epochs_per_second':number_of_epochs/elapsed,
+            'timings':acoc.timings,
+            'peak_memory_mb':peak/2**20,
+            'cost':cost,
+            'reference':reference,
+            'gap':cost/reference - 1}
+
+def print_table(results:list):
+    print('{:<6} {:<20} {:>8} {:>10} {:>10} {:>12} {:>12} {:>8}  {}'.format('algo', 'instance', 'size', 'epochs/s', 'peak MB', 'cost', 'reference', 'gap', 'phases (s)'))
+    for result in results:
+        reference = '-' if result['reference'] is None else '{:.2f}'.format(result['reference'])
+        gap = '-' if result['gap'] is None else '{:.2%}'.format(result['gap'])
+        phases = ' '.join('{}={:.3f}'.format(phase, seconds) for phase, seconds in result['timings'].items() if seconds > 0)
+        print('{:<6} {:<20} {:>8} {:>10.2f} {:>10.2f} {:>12.2f} {:>12} {:>8}  {}'.format(result['algorithm'], result['instance'], result['size'], result['epochs_per_second'], result['peak_memory_mb'], result['cost'], reference, gap, phases))
+
+def compare(results:list, baseline:list, tolerance:float):
+    # devolve as execuções que ficaram mais lentas que a referencia além da tolerancia
+    previous = {(result['algorithm'], result['instance']):result for result in baseline}
+    regressions = []
+    for result in results:
+        old = previous.get((result['algorithm'], result['instance']))
+        if old is not None and result['epochs_per_second'] < old['epochs_per_second']*(1 - tolerance):
+            regressions.append((result, old))
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark do ACO (instancias TSPLIB ou aleatorias) e do ACOC (blobs gaussianos)")
+    parser.add_argument('algorithm', choices=('aco', 'acoc'))
+    parser.add_argument('--tsplib', nargs='*', default=[], help="arquivos da TSPLIB (apenas aco)")
+    parser.add_argument('--sizes', nargs='*', type=int, default=None, help="tamanhos das instancias aleatorias ou dos blobs")
+    parser.add_argument('--epochs', type=int, default=20)
+    parser.add_argument('--ants', type=int, default=20)
+    parser.add_argument('--engine', default='matrix', help="engine do aco")
+    parser.add_argument('--candidates', type=int, default=None, help="tamanho da lista de candidatos do aco")
+    parser.add_argument('--local-search', default=None)
+    parser.add_argument('--update-strategy', default='as')
+    parser.add_argument('--dimensions', type=int, default=2, help="atributos dos blobs do acoc")
+    parser.add_argument('--clusters', type=int, default=3, help="clusters dos blobs do acoc")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None, help="salva os resultados em json")
+    parser.add_argument('--baseline', default=None, help="json de uma execução anterior, para comparar epochs/s")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="queda de epochs/s aceita em relação ao baseline")
+    arguments = parser.parse_args()
+
+    results = []
+
+    if arguments.algorithm == 'aco':
+        instances = [read_tsplib(path) for path in arguments.tsplib]
+        if not instances or arguments.sizes:
+            instances += [random_instance(size, arguments.seed) for size in (arguments.sizes or [50, 100, 200, 400])]
+
+        for instance in instances:
+            results.append(benchmark_aco(instance,
+                                         number_of_epochs=arguments.epochs,
+                                         engine=arguments.engine,
+                                         number_of_ants=arguments.ants,
+                                         candidate_list_size=arguments.candidates,
+                                         local_search=arguments.local_search,
+                                         update_strategy=arguments.update_strategy,
+                                         workers=arguments.workers,
+                                         seed=arguments.seed))
+    else:
+        for size in (arguments.sizes or [500, 1000, 2000, 4000]):
+            results.append(benchmark_acoc(size,
+                                          number_of_dimensions=arguments.dimensions,
+                                          number_of_clusters=arguments.clusters,
+                                          number_of_epochs=arguments.epochs,
+                                          number_of_ant=arguments.ants,
+                                          number_of_elite=max(1, int(round(arguments.ants*0.2))),
+                                          seed=arguments.seed,
+                                          workers=arguments.workers))
+
+    print_table(results)
+
+    if arguments.output is not None:
+        with open(arguments.output, 'w') as file:
+            json.dump(results, file, indent=2)
+
+    if arguments.baseline is not None:
+        with open(arguments.baseline) as file:
+            regressions = compare(results, json.load(file), arguments.tolerance)
+        for result, old in regressions:
+            print("regressão: {} {} {:.2f} epochs/s (antes {:.2f})".format(result['algorithm'], result['instance'], result['epochs_per_second'], old['epochs_per_second']))
+        if regressions:
+            raise SystemExit(1)
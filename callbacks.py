@@ -0,0 +1,74 @@
+import time
+
+class Callback():
+    # base dos callbacks passados para ACO.run e ACOC.run
+    # on_epoch_end recebe as metricas da época e devolve True para interromper a execução
+    def on_run_start(self, algorithm):
+        pass
+
+    def on_epoch_end(self, algorithm, metrics:dict):
+        return False
+
+    def on_run_end(self, algorithm):
+        pass
+
+class FunctionCallback(Callback):
+    # chama function(metrics) a cada época, por exemplo para exportar as metricas para um sistema de monitoramento
+    def __init__(self, function):
+        self.function = function
+
+    def on_epoch_end(self, algorithm, metrics:dict):
+        return bool(self.function(metrics))
+
+class TargetCost(Callback):
+    # interrompe quando o melhor custo chega a target
+    def __init__(self, target:float):
+        self.target = target
+
+    def on_epoch_end(self, algorithm, metrics:dict):
+        return metrics['best_cost'] <= self.target
+
+class Stagnation(Callback):
+    # interrompe após window épocas sem que o melhor custo melhore mais que tolerance (relativa)
+    def __init__(self, window:int, tolerance:float=0.0):
+        self.window = window
+        self.tolerance = tolerance
+
+    def on_run_start(self, algorithm):
+        self.best_cost = None
+        self.epochs_without_improvement = 0
+
+    def on_epoch_end(self, algorithm, metrics:dict):
+        if self.best_cost is None or metrics['best_cost'] < self.best_cost*(1 - self.tolerance):
+            self.best_cost = metrics['best_cost']
+            self.epochs_without_improvement = 0
+        else:
+            self.epochs_without_improvement += 1
+        return self.epochs_without_improvement >= self.window
+
+class TimeBudget(Callback):
+    # interrompe quando a execução passa de seconds segundos; a época em andamento sempre é concluida
+    def __init__(self, seconds:float):
+        self.seconds = seconds
+
+    def on_run_start(self, algorithm):
+        self.start = time.perf_counter()
+
+    def on_epoch_end(self, algorithm, metrics:dict):
+        return time.perf_counter() - self.start >= self.seconds
+
+class Checkpoint(Callback):
+    # grava um checkpoint (save_checkpoint do ACO ou do ACOC) a cada every épocas e ao fim da execução
+    # uma execução interrompida por uma exceção não é gravada, o estado pode ser o de uma época pela metade
+    def __init__(self, path:str, every:int=10):
+        self.path = path
+        self.every = every
+
+    def on_epoch_end(self, algorithm, metrics:dict):
+        if metrics['epoch'] % self.every == 0:
+            algorithm.save_checkpoint(self.path)
+        return False
+
+    def on_run_end(self, algorithm):
+        if algorithm.epoch > 0 and not algorithm.interrupted:
+            algorithm.save_checkpoint(self.path)
@@ -0,0 +1,35 @@
+import json
+import os
+import tempfile
+import numpy as np
+
+def save_checkpoint(path:str, arrays:dict, metadata:dict):
+    # grava os arrays e os metadados (em json) em um arquivo .npz, sem pickle
+    # o arquivo é escrito em um temporario no mesmo diretorio e só então substitui o anterior,
+    # assim uma interrupção durante a escrita nunca deixa um checkpoint incompleto
+    directory = os.path.dirname(os.path.abspath(path))
+    descriptor, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+
+    try:
+        with os.fdopen(descriptor, 'wb') as file:
+            np.savez(file, metadata=np.array(json.dumps(metadata)), **arrays)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.unlink(temporary)
+        raise
+
+def load_checkpoint(path:str):
+    # devolve (arrays, metadados)
+    with np.load(path, allow_pickle=False) as archive:
+        metadata = json.loads(str(archive['metadata']))
+        arrays = {key:archive[key] for key in archive.files if key != 'metadata'}
+    return arrays, metadata
+
+def check_parameters(saved:dict, current:dict):
+    # o checkpoint só pode ser carregado por uma instancia com os mesmos parametros
+    different = [key for key in current if saved.get(key) != current[key]]
+    if different:
+        raise Exception("Error: The checkpoint was created with different parameters: {}".format(', '.join(different)))
@@ -0,0 +1,165 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+# apenas modulos da biblioteca padrão são importados aqui: o numpy, o ACO e o ACOC são importados
+# dentro de cada tarefa, assim o comando começa a responder sem esperar por eles
+
+ACO_EXTENSIONS = ('.tsp',)
+ACOC_EXTENSIONS = ('.csv', '.txt', '.data', '.npy', '.npz')
+
+def algorithm_of(path:str):
+    # algoritmo de um arquivo pela extensão: instancias da TSPLIB no ACO, conjuntos de dados no ACOC
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ACO_EXTENSIONS:
+        return 'aco'
+    if extension in ACOC_EXTENSIONS:
+        return 'acoc'
+    return None
+
+def read_manifest(path:str):
+    # um json por linha, com path e, opcionalmente, id, algorithm e parameters (parametros proprios da tarefa)
+    # caminhos relativos são relativos ao diretorio do manifesto
+    directory = os.path.dirname(os.path.abspath(path))
+    jobs = []
+    with open(path) as file:
+        for line in file:
+            if not line.strip():
+                continue
+            job = json.loads(line)
+            job['path'] = os.path.join(directory, job['path'])
+            jobs.append(job)
+    return jobs
+
+def collect_jobs(paths:list):
+    # cada caminho pode ser um manifesto (.jsonl), um diretorio (todas as instancias e conjuntos de dados dentro dele) ou um arquivo
+    jobs = []
+    for path in paths:
+        if path.endswith('.jsonl'):
+            jobs.extend(read_manifest(path))
+        elif os.path.isdir(path):
+            jobs.extend({'path':os.path.join(path, name)} for name in sorted(os.listdir(path)) if algorithm_of(name) is not None)
+        else:
+            jobs.append({'path':path})
+
+    for i, job in enumerate(jobs):
+        job.setdefault('id', i)
+        job.setdefault('algorithm', algorithm_of(job['path']))
+        job.setdefault('parameters', {})
+        if job['algorithm'] not in ('aco', 'acoc'):
+            raise Exception("Error: Unknown algorithm for {}".format(job['path']))
+    return jobs
+
+def solve_aco(path:str, parameters:dict):
+    from aco import ACO
+    from benchmark import instance_arguments, read_tsplib
+
+    instance = read_tsplib(path)
+    parameters = {'engine':'matrix', 'history':'summary', **parameters}
+    aco = ACO(**instance_arguments(instance, parameters['engine']), **parameters)
+
+    # o caminho é dado pelos indices dos vertices na ordem do arquivo, começando em 0
+    return {'instance':instance['name'],
+            'best_cost':float(aco.best_ant.calculate_distance()),
+            'tour':aco.best_ant.compact_tour().tolist(),
+            'epochs':aco.epoch,
+            'timings':aco.timings}
+
+def solve_acoc(path:str, parameters:dict):
+    from acoc import ACOC, ACOCGraph
+    from loader import load_array
+
+    parameters = dict(parameters)
+    data, target = load_array(path, target_column=parameters.pop('target_column', None), normalization=parameters.pop('normalization', None))
+    graph = ACOCGraph(data=data, target=target, number_of_clusters=parameters['number_of_clusters'], initial_pheromone=parameters.pop('initial_pheromone', 0.1))
+
+    # numero de formigas e de formigas de elite como no exemplo do ACOC, se não forem dados
+    parameters.setdefault('number_of_ant', max(1, int(round(graph.number_of_objects*0.05))))
+    parameters.setdefault('number_of_elite', max(1, int(round(parameters['number_of_ant']*0.2))))
+    parameters = {'distance_expoent':1, 'pheromone_expoent':1, 'evaporation_constant':0.01, 'history':'summary', **parameters}
+    acoc = ACOC(graph, **parameters)
+
+    return {'instance':os.path.basename(path),
+            'best_cost':float(acoc.better_solution.evaluate_solution()),
+            'labels':acoc.better_solution.compact_solution().tolist(),
+            'epochs':acoc.epoch,
+            'timings':acoc.timings}
+
+def solve(job:dict):
+    # executa uma tarefa e devolve a linha de resultado; um erro vira o campo error, sem interromper as demais tarefas
+    result = {'id':job['id'], 'algorithm':job['algorithm'], 'path':job['path']}
+    start = time.perf_counter()
+    try:
+        if job['algorithm'] == 'aco':
+            result.update(solve_aco(job['path'], job['parameters']))
+        else:
+            result.update(solve_acoc(job['path'], job['parameters']))
+    except Exception as error:
+        result['error'] = str(error)
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+def run_jobs(jobs:list, processes:int=None):
+    # gera os resultados à medida que as tarefas terminam, não na ordem das tarefas
+    if processes == 1 or len(jobs) <= 1:
+        for job in jobs:
+            yield solve(job)
+        return
+
+    with multiprocessing.get_context().Pool(processes) as pool:
+        for result in pool.imap_unordered(solve, jobs):
+            yield result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resolve em lote instancias da TSPLIB (ACO) e conjuntos de dados (ACOC), com um resultado json por linha")
+    parser.add_argument('paths', nargs='+', help="arquivos, diretorios ou manifestos .jsonl")
+    parser.add_argument('--processes', type=int, default=None, help="tarefas resolvidas em paralelo (por padrão, uma por cpu)")
+    parser.add_argument('--output', default=None, help="arquivo .jsonl de saida (por padrão, a saida padrão)")
+    parser.add_argument('--epochs', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--ants', type=int, default=None, help="formigas por época (por padrão, uma por vertice no aco e 5%% dos objetos no acoc)")
+    parser.add_argument('--engine', default='matrix', help="engine do aco")
+    parser.add_argument('--candidates', type=int, default=None, help="tamanho da lista de candidatos do aco")
+    parser.add_argument('--local-search', default=None, help="busca local do aco")
+    parser.add_argument('--update-strategy', default='as', help="regra de atualização do aco")
+    parser.add_argument('--clusters', type=int, default=3, help="clusters do acoc")
+    parser.add_argument('--target-column', type=int, default=None, help="coluna de classe dos dados do acoc")
+    parser.add_argument('--normalization', default=None, help="normalização dos dados do acoc")
+    parser.add_argument('--parameters', default='{}', help="json com outros parametros de cada algoritmo, por exemplo '{\"aco\": {...}, \"acoc\": {...}}'")
+    arguments = parser.parse_args()
+
+    # parametros comuns de cada algoritmo; os parameters do manifesto têm prioridade sobre eles
+    common = {'aco':{'number_of_epochs':arguments.epochs,
+                     'seed':arguments.seed,
+                     'number_of_ants':arguments.ants,
+                     'engine':arguments.engine,
+                     'candidate_list_size':arguments.candidates,
+                     'local_search':arguments.local_search,
+                     'update_strategy':arguments.update_strategy},
+              'acoc':{'number_of_epochs':arguments.epochs,
+                      'seed':arguments.seed,
+                      'number_of_clusters':arguments.clusters,
+                      'target_column':arguments.target_column,
+                      'normalization':arguments.normalization}}
+    if arguments.ants is not None:
+        common['acoc']['number_of_ant'] = arguments.ants
+    # os parametros de --parameters são separados por algoritmo, já que o ACO e o ACOC não aceitam os mesmos
+    extra = json.loads(arguments.parameters)
+    if not isinstance(extra, dict) or any(algorithm not in common for algorithm in extra):
+        raise Exception("Error: --parameters must map 'aco' and/or 'acoc' to their parameters")
+
+    jobs = collect_jobs(arguments.paths)
+    for job in jobs:
+        job['parameters'] = {**common[job['algorithm']], **extra.get(job['algorithm'], {}), **job['parameters']}
+
+    output = sys.stdout if arguments.output is None else open(arguments.output, 'w')
+    try:
+        for result in run_jobs(jobs, arguments.processes):
+            output.write(json.dumps(result) + '\n')
+            output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
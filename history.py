@@ -0,0 +1,126 @@
+import heapq
+import itertools
+import numpy as np
+
+HISTORY_MODES = ('summary', 'best', 'full')
+
+class History():
+    def __init__(self,
+                 mode:str='full',
+                 capacity:int=0,
+                 keep_best:int=1):
+
+        # mode = 'summary' guarda apenas o melhor, a média e o pior custo de cada época
+        # mode = 'best' guarda também as keep_best melhores soluções, como arrays de inteiros
+        # mode = 'full' guarda também tudo o que é passado em entry (por exemplo todas as formigas da época) em epochs_dict
+        if mode not in HISTORY_MODES:
+            raise Exception("Error: Invalid history mode")
+
+        self.mode = mode
+        self.keep_best = keep_best
+        self.size = 0
+
+        # arrays pré-alocados com uma posição por época, aumentados se forem executadas mais épocas
+        capacity = max(capacity, 1)
+        self.epoch_array = np.zeros(capacity, dtype=np.int64)
+        self.best_array = np.full(capacity, np.nan)
+        self.mean_array = np.full(capacity, np.nan)
+        self.worst_array = np.full(capacity, np.nan)
+
+        # heap com as melhores soluções, o topo é a pior delas: (-custo, ordem de chegada, época, solução)
+        self.best_heap = []
+        self.counter = itertools.count()
+
+        self.epochs_dict = {}
+
+    def grow(self, capacity:int):
+        for name in ('epoch_array', 'best_array', 'mean_array', 'worst_array'):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype) if name == 'epoch_array' else np.full(capacity, np.nan)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def record(self,
+               epoch:int,
+               costs:np.ndarray,
+               solution=None,
+               entry=None):
+
+        # costs tem o custo de cada individuo da época
+        # solution(i) devolve a solução compacta do individuo i, chamada apenas para os que entram entre os melhores
+        costs = np.asarray(costs, dtype=np.float64)
+
+        if self.size == len(self.best_array):
+            self.grow(2*len(self.best_array))
+
+        self.epoch_array[self.size] = epoch
+        self.best_array[self.size] = costs.min()
+        self.mean_array[self.size] = costs.mean()
+        self.worst_array[self.size] = costs.max()
+        self.size += 1
+
+        if self.mode in ('best', 'full') and solution is not None:
+            # apenas os keep_best melhores da época podem entrar entre os melhores de todas as épocas
+            number_of_candidates = min(self.keep_best, len(costs))
+            candidates = np.argpartition(costs, number_of_candidates - 1)[:number_of_candidates]
+
+            for i in candidates[np.argsort(costs[candidates])]:
+                cost = float(costs[i])
+                if len(self.best_heap) < self.keep_best:
+                    heapq.heappush(self.best_heap, (-cost, next(self.counter), epoch, solution(int(i))))
+                elif cost < -self.best_heap[0][0]:
+                    heapq.heapreplace(self.best_heap, (-cost, next(self.counter), epoch, solution(int(i))))
+                else:
+                    break
+
+        if self.mode == 'full' and entry is not None:
+            self.epochs_dict[epoch] = entry
+
+    @property
+    def epochs(self):
+        return self.epoch_array[:self.size]
+
+    @property
+    def best_costs(self):
+        return self.best_array[:self.size]
+
+    @property
+    def mean_costs(self):
+        return self.mean_array[:self.size]
+
+    @property
+    def worst_costs(self):
+        return self.worst_array[:self.size]
+
+    @property
+    def best_solutions(self):
+        # lista de (custo, época, solução), da melhor para a pior
+        return [(-cost, epoch, solution) for cost, _, epoch, solution in sorted(self.best_heap, reverse=True)]
+
+    def state(self):
+        # arrays com o estado do histórico, usados nos checkpoints; epochs_dict (mode = 'full') não é guardado
+        solutions = [solution for _, _, solution in self.best_solutions]
+        return {'epochs':self.epochs.copy(),
+                'best_costs':self.best_costs.copy(),
+                'mean_costs':self.mean_costs.copy(),
+                'worst_costs':self.worst_costs.copy(),
+                'solution_costs':np.array([cost for cost, _, _ in self.best_solutions], dtype=np.float64),
+                'solution_epochs':np.array([epoch for _, epoch, _ in self.best_solutions], dtype=np.int64),
+                'solution_sizes':np.array([len(solution) for solution in solutions], dtype=np.int64),
+                'solutions':np.concatenate(solutions) if solutions else np.zeros(0, dtype=np.int32)}
+
+    def load_state(self, state:dict):
+        self.size = 0
+        self.grow(max(len(state['epochs']), len(self.best_array)))
+        self.size = len(state['epochs'])
+        self.epoch_array[:self.size] = state['epochs']
+        self.best_array[:self.size] = state['best_costs']
+        self.mean_array[:self.size] = state['mean_costs']
+        self.worst_array[:self.size] = state['worst_costs']
+
+        self.best_heap = []
+        self.counter = itertools.count()
+        solutions = np.split(state['solutions'], np.cumsum(state['solution_sizes'])[:-1]) if len(state['solution_sizes']) else []
+        for cost, epoch, solution in zip(state['solution_costs'].tolist(), state['solution_epochs'].tolist(), solutions):
+            heapq.heappush(self.best_heap, (-cost, next(self.counter), epoch, solution))
+        self.epochs_dict.clear()
@@ -0,0 +1,174 @@
+import multiprocessing
+import queue
+import numpy as np
+from aco import ACO
+from acoc import ACOC, ACOCGraph
+
+MIGRATIONS = ('best', 'pheromone', 'both')
+
+def island_seed(seed:int, island:int):
+    # semente de cada ilha, derivada da semente do modelo
+    return int(np.random.SeedSequence(seed, spawn_key=(island,)).generate_state(1)[0])
+
+def build_colony(algorithm:str, parameters:dict):
+    # cria a colonia da ilha sem executa-la; no ACOC o grafo é criado a partir de data (e target) em parameters
+    if algorithm == 'aco':
+        return ACO(autorun=False, **parameters)
+    if algorithm == 'acoc':
+        parameters = dict(parameters)
+        graph = ACOCGraph(data=parameters.pop('data'), target=parameters.pop('target', None), number_of_clusters=parameters['number_of_clusters'], initial_pheromone=parameters.pop('initial_pheromone', 0.1))
+        return ACOC(graph, autorun=False, **parameters)
+    raise Exception("Error: Invalid algorithm")
+
+def best_cost(colony):
+    if isinstance(colony, ACO):
+        return float(colony.best_ant.calculate_distance())
+    return float(colony.better_solution.evaluate_solution())
+
+def best_solution(colony):
+    if isinstance(colony, ACO):
+        return colony.best_ant.compact_tour()
+    return colony.better_solution.compact_solution()
+
+def pheromone(colony):
+    if isinstance(colony, ACO):
+        return colony.graph.get_pheromone()
+    return colony.graph.matrix.copy()
+
+def emigrate(colony, migration:str):
+    # o que a ilha envia para a vizinha: a melhor solução e/ou o feromonio
+    payload = {'cost':best_cost(colony)}
+    if migration in ('best', 'both'):
+        payload['solution'] = best_solution(colony)
+    if migration in ('pheromone', 'both'):
+        payload['pheromone'] = pheromone(colony)
+    return payload
+
+def immigrate(colony, payload:dict, blend:float):
+    # o feromonio recebido é misturado ao da ilha, (1 - blend)*proprio + blend*recebido,
+    # e a solução recebida é tratada como uma formiga da ilha (ver accept_migrant)
+    if 'pheromone' in payload:
+        mixed = (1 - blend)*pheromone(colony) + blend*payload['pheromone']
+        if isinstance(colony, ACO):
+            colony.graph.set_pheromone(mixed)
+        else:
+            colony.graph.matrix[...] = mixed
+    if 'solution' in payload:
+        colony.accept_migrant(payload['solution'])
+
+def island_result(island:int, colony):
+    return {'island':island,
+            'best_cost':best_cost(colony),
+            'best_solution':best_solution(colony),
+            'best_costs':colony.history.best_costs.copy(),
+            'epochs':colony.epoch}
+
+def rounds(number_of_epochs:int, migration_interval:int):
+    # épocas executadas entre cada migração, a ultima rodada fica com o resto
+    return [min(migration_interval, number_of_epochs - start) for start in range(0, number_of_epochs, migration_interval)]
+
+def run_island(island:int, algorithm:str, parameters:dict, schedule:list, migration:str, blend:float, inbox, outbox, results):
+    # executado em um processo por ilha: a cada rodada executa as épocas, envia para a vizinha e espera o que vem da anterior
+    colony = build_colony(algorithm, parameters)
+    for i, number_of_epochs in enumerate(schedule):
+        colony.run(number_of_epochs)
+        if i < len(schedule) - 1:
+            outbox.put(emigrate(colony, migration))
+            immigrate(colony, inbox.get(), blend)
+    results.put(island_result(island, colony))
+
+class IslandModel():
+    def __init__(self,
+                 algorithm:str,
+                 parameters:dict,
+                 island_parameters:list,
+                 number_of_epochs:int,
+                 migration_interval:int=10,
+                 migration:str='best',
+                 blend:float=0.5,
+                 seed:int=None,
+                 processes:bool=True):
+
+        # algorithm = 'aco' ou 'acoc'; parameters são os parametros comuns das colonias (para o ACO, os do construtor,
+        # para o ACOC, os do construtor mais data, target e initial_pheromone) e island_parameters tem um dict por ilha
+        # com os parametros proprios, por exemplo distance_expoent, pheromone_expoent, evaporation_constant ou method_of_selection
+        # a cada migration_interval épocas cada ilha envia para a proxima (em anel) a sua melhor solução (migration = 'best'),
+        # o seu feromonio (migration = 'pheromone', misturado com peso blend) ou os dois (migration = 'both')
+        # com processes=True cada ilha roda em um processo, com processes=False as ilhas rodam em sequencia no processo atual
+        if algorithm not in ('aco', 'acoc'):
+            raise Exception("Error: Invalid algorithm")
+        if migration not in MIGRATIONS:
+            raise Exception("Error: Invalid migration")
+
+        self.algorithm = algorithm
+        self.number_of_epochs = number_of_epochs
+        self.migration_interval = migration_interval
+        self.migration = migration
+        self.blend = blend
+        self.processes = processes
+
+        # cada ilha tem sua propria semente, derivada de seed, a não ser que island_parameters defina outra
+        self.island_parameters = []
+        for island, own_parameters in enumerate(island_parameters):
+            merged = {**parameters, 'number_of_epochs':number_of_epochs}
+            if seed is not None:
+                merged['seed'] = island_seed(seed, island)
+            merged.update(own_parameters)
+            self.island_parameters.append(merged)
+
+        self.results = []
+        self.best = None
+
+    def run(self):
+        schedule = rounds(self.number_of_epochs, self.migration_interval)
+
+        if self.processes:
+            self.results = self.run_in_processes(schedule)
+        else:
+            self.results = self.run_in_sequence(schedule)
+
+        # resultados de cada ilha, na ordem das ilhas; best é o da ilha com o menor custo
+        self.best = min(self.results, key=lambda result: result['best_cost'])
+        return self.results
+
+    def run_in_sequence(self, schedule:list):
+        colonies = [build_colony(self.algorithm, parameters) for parameters in self.island_parameters]
+        for i, number_of_epochs in enumerate(schedule):
+            for colony in colonies:
+                colony.run(number_of_epochs)
+            if i < len(schedule) - 1:
+                payloads = [emigrate(colony, self.migration) for colony in colonies]
+                # em anel, cada ilha recebe da anterior
+                for island, colony in enumerate(colonies):
+                    immigrate(colony, payloads[island - 1], self.blend)
+        return [island_result(island, colony) for island, colony in enumerate(colonies)]
+
+    def run_in_processes(self, schedule:list):
+        context = multiprocessing.get_context()
+        number_of_islands = len(self.island_parameters)
+
+        # a fila i é a caixa de entrada da ilha i, escrita pela ilha anterior
+        queues = [context.Queue() for _ in range(number_of_islands)]
+        results = context.Queue()
+
+        workers = [context.Process(target=run_island, args=(island, self.algorithm, parameters, schedule, self.migration, self.blend, queues[island], queues[(island + 1) % number_of_islands], results))
+                   for island, parameters in enumerate(self.island_parameters)]
+        for worker in workers:
+            worker.start()
+
+        collected = []
+        try:
+            while len(collected) < number_of_islands:
+                try:
+                    collected.append(results.get(timeout=1))
+                except queue.Empty:
+                    # se uma ilha terminou com erro, as vizinhas ficariam esperando a migração para sempre
+                    if any(worker.exitcode not in (None, 0) for worker in workers):
+                        raise Exception("Error: An island process failed")
+        finally:
+            for worker in workers:
+                if len(collected) < number_of_islands:
+                    worker.terminate()
+                worker.join()
+
+        return sorted(collected, key=lambda result: result['island'])
@@ -0,0 +1,158 @@
+import os
+import itertools
+import numpy as np
+
+NORMALIZATIONS = ('min-max', 'max-abs', 'max')
+
+def csv_shape(path:str, delimiter:str=',', skip_header:int=0):
+    # conta linhas e colunas sem carregar o arquivo, linhas vazias são ignoradas
+    number_of_rows = 0
+    number_of_columns = None
+    with open(path) as file:
+        for line in itertools.islice(file, skip_header, None):
+            if not line.strip():
+                continue
+            if number_of_columns is None:
+                number_of_columns = len(line.split(delimiter))
+            number_of_rows += 1
+
+    if number_of_columns is None:
+        raise Exception("Error: The file is empty")
+    return number_of_rows, number_of_columns
+
+def csv_chunks(path:str, delimiter:str=',', skip_header:int=0, chunk_size:int=65536):
+    # le o csv em blocos de chunk_size linhas, cada bloco convertido de uma vez em um array (linha, coluna)
+    with open(path) as file:
+        lines = (line for line in itertools.islice(file, skip_header, None) if line.strip())
+        while True:
+            chunk = list(itertools.islice(lines, chunk_size))
+            if not chunk:
+                return
+            yield np.loadtxt(chunk, delimiter=delimiter, dtype=np.float64, ndmin=2)
+
+def array_chunks(array:np.ndarray, chunk_size:int=65536):
+    for start in range(0, len(array), chunk_size):
+        yield np.asarray(array[start:start + chunk_size], dtype=np.float64)
+
+def allocate(shape:tuple, dtype, out:str=None):
+    # com out o array é um arquivo .npy mapeado em memoria, que pode ser reaberto depois com load_array(out, mmap=True)
+    if out is None:
+        return np.empty(shape, dtype=dtype)
+    return np.lib.format.open_memmap(out, mode='w+', dtype=dtype, shape=shape)
+
+def column_statistics(data:np.ndarray, chunk_size:int=65536):
+    # minimo e maximo de cada coluna em uma unica passada pelos dados, um bloco de linhas por vez
+    minimum = np.full(data.shape[1], np.inf)
+    maximum = np.full(data.shape[1], -np.inf)
+    for chunk in array_chunks(data, chunk_size):
+        np.minimum(minimum, chunk.min(axis=0), out=minimum)
+        np.maximum(maximum, chunk.max(axis=0), out=maximum)
+    return minimum, maximum
+
+def normalize(data:np.ndarray, method:str='min-max', chunk_size:int=65536, out:np.ndarray=None):
+    # method = 'min-max' leva cada coluna para [0, 1]
+    # method = 'max-abs' divide cada coluna pelo maior valor absoluto, levando para [-1, 1]
+    # method = 'max' divide cada coluna pelo seu maior valor, como era feito no exemplo do ACOC
+    # o resultado é escrito em out (por padrão, no proprio data), um bloco de linhas por vez
+    if method not in NORMALIZATIONS:
+        raise Exception("Error: Invalid normalization")
+
+    minimum, maximum = column_statistics(data, chunk_size)
+
+    if method == 'min-max':
+        offset = minimum
+        scale = maximum - minimum
+    elif method == 'max-abs':
+        offset = np.zeros_like(minimum)
+        scale = np.maximum(np.abs(minimum), np.abs(maximum))
+    else:
+        offset = np.zeros_like(minimum)
+        scale = maximum.copy()
+
+    # colunas constantes (ou nulas) ficariam com divisão por zero, são apenas deslocadas
+    scale[scale == 0] = 1
+
+    if out is None:
+        out = data
+    for start in range(0, len(data), chunk_size):
+        chunk = np.asarray(data[start:start + chunk_size], dtype=np.float64)
+        out[start:start + chunk_size] = (chunk - offset)/scale
+
+    if isinstance(out, np.memmap):
+        out.flush()
+    return out
+
+def load_array(path:str,
+               target_column:int=None,
+               delimiter:str=',',
+               skip_header:int=0,
+               dtype=np.float64,
+               mmap:bool=False,
+               normalization:str=None,
+               out:str=None,
+               chunk_size:int=65536):
+
+    # carrega um csv, .npy ou .npz em um unico array contiguo (objeto, atributo), sem criar objetos python por linha
+    # target_column é a coluna com a classe de cada objeto, retirada dos dados e devolvida em separado
+    # com mmap=True um .npy é mapeado em memoria em vez de lido; com out, o resultado é escrito em um .npy mapeado em memoria
+    # devolve (data, target), target é None quando não há coluna de classe
+    # um .npz deve ter o array 'data' e, opcionalmente, 'target'
+    if normalization is not None and normalization not in NORMALIZATIONS:
+        raise Exception("Error: Invalid normalization")
+
+    extension = os.path.splitext(path)[1].lower()
+    target = None
+
+    if extension in ('.npy', '.npz'):
+        if extension == '.npy':
+            source = np.load(path, mmap_mode='r' if mmap else None)
+        else:
+            # arquivos .npz são zip, não podem ser mapeados em memoria
+            with np.load(path) as archive:
+                source = archive['data']
+                if 'target' in archive:
+                    target = archive['target']
+
+        if source.ndim != 2:
+            raise Exception("Error: The data must be a two-dimensional array")
+
+        columns = np.arange(source.shape[1])
+        if target_column is not None:
+            target = np.asarray(source[:, target_column])
+            columns = np.delete(columns, target_column)
+
+        # sem nada a alterar, o array é devolvido como foi carregado (mapeado em memoria com mmap=True)
+        if target_column is None and normalization is None and out is None and source.dtype == dtype:
+            return source, target
+
+        number_of_rows = source.shape[0]
+        chunks = array_chunks(source, chunk_size)
+    elif extension in ('.csv', '.txt', '.data'):
+        number_of_rows, number_of_columns = csv_shape(path, delimiter, skip_header)
+        columns = np.arange(number_of_columns)
+        if target_column is not None:
+            target = np.empty(number_of_rows, dtype=np.float64)
+            columns = np.delete(columns, target_column)
+        chunks = csv_chunks(path, delimiter, skip_header, chunk_size)
+    else:
+        raise Exception("Error: Invalid file format")
+
+    # os dados são copiados bloco a bloco para o array de destino, que pode ser um arquivo mapeado em memoria
+    data = allocate((number_of_rows, len(columns)), dtype, out)
+    start = 0
+    for chunk in chunks:
+        end = start + len(chunk)
+        if target_column is not None and extension not in ('.npy', '.npz'):
+            target[start:end] = chunk[:, target_column]
+        data[start:end] = chunk[:, columns]
+        start = end
+
+    if target is not None and np.all(np.mod(target, 1) == 0):
+        target = target.astype(np.int64)
+
+    if normalization is not None:
+        normalize(data, normalization, chunk_size)
+    elif isinstance(data, np.memmap):
+        data.flush()
+
+    return data, target
@@ -0,0 +1,178 @@
+from collections import deque
+import numpy as np
+
+LOCAL_SEARCH_METHODS = ('2-opt', 'or-opt', '2-opt+or-opt')
+
+# melhoria minima para aceitar um movimento, evita ciclos por erro de arredondamento
+EPSILON = 1e-10
+
+def tour_length(tour:np.ndarray, distance_matrix:np.ndarray):
+    return float(distance_matrix[tour, np.roll(tour, -1)].sum())
+
+def reverse(tour:list, position:list, i:int, j:int):
+    # inverte o trecho do caminho que vai da posição i até a posição j (andando para frente, de forma circular)
+    # se o trecho for maior que metade do caminho, inverte o complemento, que resulta no mesmo ciclo
+    number_of_vertex = len(tour)
+    length = (j - i) % number_of_vertex + 1
+
+    if 2*length > number_of_vertex:
+        i, j = (j + 1) % number_of_vertex, (i - 1) % number_of_vertex
+        length = number_of_vertex - length
+
+    for _ in range(length // 2):
+        tour[i], tour[j] = tour[j], tour[i]
+        position[tour[i]] = i
+        position[tour[j]] = j
+        i = (i + 1) % number_of_vertex
+        j = (j - 1) % number_of_vertex
+
+def two_opt(tour:np.ndarray, distance_matrix, neighbour_list):
+    # 2-opt com lista de vizinhos e bits "don't look": um vertice só volta a ser examinado
+    # quando uma das arestas que o tocam é alterada
+    number_of_vertex = len(tour)
+    if number_of_vertex < 4:
+        return np.asarray(tour)
+
+    tour = [int(vertex) for vertex in tour]
+    position = [0]*number_of_vertex
+    for i, vertex in enumerate(tour):
+        position[vertex] = i
+
+    # a lista de vizinhos pode ser uma matriz ou uma lista de listas (com tamanhos diferentes por vertice)
+    if isinstance(neighbour_list, np.ndarray):
+        neighbour_list = neighbour_list.tolist()
+    distance = distance_matrix
+    queue = deque(tour)
+    in_queue = [True]*number_of_vertex
+
+    while queue:
+        a = queue.popleft()
+        in_queue[a] = False
+
+        for step in (1, -1):
+            # step = 1 considera a aresta (a, sucessor de a), step = -1 a aresta (antecessor de a, a)
+            a_next = tour[(position[a] + step) % number_of_vertex]
+            distance_a = distance[a, a_next]
+            improved = False
+
+            for c in neighbour_list[a]:
+                distance_ac = distance[a, c]
+                # os vizinhos estão ordenados pela distancia, a partir daqui não há ganho possivel
+                if distance_ac >= distance_a:
+                    break
+
+                c_next = tour[(position[c] + step) % number_of_vertex]
+                # com vertices repetidos (distancia zero) o proprio a pode estar na sua lista de vizinhos,
+                # e o movimento com c = a teria um ganho que não existe
+                if c == a or c == a_next or c_next == a:
+                    continue
+
+                delta = distance_ac + distance[a_next, c_next] - distance_a - distance[c, c_next]
+
+                if delta < -EPSILON:
+                    if step == 1:
+                        reverse(tour, position, position[a_next], position[c])
+                    else:
+                        reverse(tour, position, position[c], position[a_next])
+
+                    for vertex in (a, a_next, c, c_next):
+                        if not in_queue[vertex]:
+                            queue.append(vertex)
+                            in_queue[vertex] = True
+                    improved = True
+                    break
+
+            if improved:
+                break
+
+    return np.array(tour, dtype=np.int64)
+
+def or_opt(tour:np.ndarray, distance_matrix, neighbour_list, max_segment_length:int=3):
+    # Or-opt: move trechos de 1 a max_segment_length vertices para junto de um vizinho, na mesma ordem ou invertidos
+    number_of_vertex = len(tour)
+    if number_of_vertex < max_segment_length + 3:
+        return np.asarray(tour)
+
+    tour = [int(vertex) for vertex in tour]
+    position = [0]*number_of_vertex
+    for i, vertex in enumerate(tour):
+        position[vertex] = i
+
+    # a lista de vizinhos pode ser uma matriz ou uma lista de listas (com tamanhos diferentes por vertice)
+    if isinstance(neighbour_list, np.ndarray):
+        neighbour_list = neighbour_list.tolist()
+    distance = distance_matrix
+    queue = deque(tour)
+    in_queue = [True]*number_of_vertex
+
+    while queue:
+        start = queue.popleft()
+        in_queue[start] = False
+        improved = False
+
+        for segment_length in range(1, max_segment_length + 1):
+            start_position = position[start]
+            segment = [tour[(start_position + k) % number_of_vertex] for k in range(segment_length)]
+            end = segment[-1]
+            previous = tour[(start_position - 1) % number_of_vertex]
+            following = tour[(start_position + segment_length) % number_of_vertex]
+
+            # ganho ao retirar o trecho e ligar diretamente seu antecessor ao seu sucessor
+            removal_gain = distance[previous, start] + distance[end, following] - distance[previous, following]
+            if removal_gain <= EPSILON:
+                continue
+
+            for endpoint in (start, end):
+                for c in neighbour_list[endpoint]:
+                    if distance[endpoint, c] >= removal_gain:
+                        break
+                    if c in segment:
+                        continue
+
+                    # o trecho pode entrar entre c e o seu sucessor ou entre o antecessor de c e c
+                    for c_first, c_second in ((c, tour[(position[c] + 1) % number_of_vertex]), (tour[(position[c] - 1) % number_of_vertex], c)):
+                        if c_first in segment or c_second in segment:
+                            continue
+
+                        insertion_cost = distance[c_first, c_second]
+                        forward = distance[c_first, start] + distance[end, c_second] - insertion_cost
+                        backward = distance[c_first, end] + distance[start, c_second] - insertion_cost
+
+                        if min(forward, backward) < removal_gain - EPSILON:
+                            moved = segment if forward <= backward else segment[::-1]
+                            segment_set = set(segment)
+                            rest = [vertex for vertex in tour if vertex not in segment_set]
+                            insert_at = rest.index(c_first) + 1
+                            tour = rest[:insert_at] + moved + rest[insert_at:]
+                            for i, vertex in enumerate(tour):
+                                position[vertex] = i
+
+                            for vertex in (previous, following, c_first, c_second, start, end):
+                                if not in_queue[vertex]:
+                                    queue.append(vertex)
+                                    in_queue[vertex] = True
+                            improved = True
+                            break
+
+                    if improved:
+                        break
+                if improved:
+                    break
+            if improved:
+                break
+
+    return np.array(tour, dtype=np.int64)
+
+def improve_tour(tour:np.ndarray, distance_matrix, neighbour_list, method:str='2-opt'):
+    # distance_matrix pode ser qualquer objeto acessado como distance_matrix[origem, destino], por exemplo as distancias sob demanda do SparseGraph
+    if method not in LOCAL_SEARCH_METHODS:
+        raise Exception("Error: Invalid local search method")
+
+    if method in ('2-opt', '2-opt+or-opt'):
+        tour = two_opt(tour, distance_matrix, neighbour_list)
+    if method in ('or-opt', '2-opt+or-opt'):
+        tour = or_opt(tour, distance_matrix, neighbour_list)
+        if method == '2-opt+or-opt':
+            tour = two_opt(tour, distance_matrix, neighbour_list)
+
+    return tour
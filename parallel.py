@@ -0,0 +1,81 @@
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+
+class RandomStream():
+    # gerador de numeros aleatorios de uma formiga (ou de uma execução), sobre um numpy.random.Generator
+    # os numeros uniformes são sorteados em blocos de block_size, evitando uma chamada ao Generator por sorteio
+    def __init__(self, 
+                 generator:np.random.Generator=None, 
+                 block_size:int=256):
+        self.generator = generator if generator is not None else np.random.default_rng()
+        self.block_size = block_size
+        self.buffer = []
+        self.position = 0
+
+    def random(self):
+        # numero uniforme em [0, 1)
+        if self.position == len(self.buffer):
+            self.buffer = self.generator.random(self.block_size).tolist()
+            self.position = 0
+        value = self.buffer[self.position]
+        self.position += 1
+        return value
+
+    def randrange(self, stop:int):
+        return min(int(self.random()*stop), stop - 1)
+
+    def choice(self, items:list):
+        return items[self.randrange(len(items))]
+
+    def integers(self, stop:int, size:int):
+        return self.generator.integers(stop, size=size)
+
+    def permutation(self, size:int):
+        return self.generator.permutation(size)
+
+    def sample(self, stop:int, size:int):
+        # size valores distintos em [0, stop), sem percorrer todo o intervalo quando size é bem menor que stop
+        return self.generator.choice(stop, size=min(size, stop), replace=False)
+
+def random_stream(entropy:int, *keys:int):
+    # gerador independente derivado da entropia da execução e de chaves como a época e o indice da formiga
+    # (um filho da SeedSequence da execução), assim o resultado não depende de quantos processos constroem as formigas
+    # nem de outras execuções no mesmo processo
+    return RandomStream(np.random.default_rng(np.random.SeedSequence(entropy, spawn_key=keys)))
+
+class SharedArray():
+    def __init__(self,
+                 shape:tuple,
+                 dtype=np.float64,
+                 name:str=None):
+
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+
+        # sem nome cria-se um novo bloco de memoria compartilhada, com nome conecta-se a um bloco existente
+        if name is None:
+            size = max(int(np.prod(self.shape))*self.dtype.itemsize, 1)
+            self.shared_memory = shared_memory.SharedMemory(create=True, size=size)
+            self.owner = True
+        else:
+            self.shared_memory = shared_memory.SharedMemory(name=name)
+            # quem remove o bloco é o processo que o criou, os processos de trabalho apenas se conectam a ele
+            self.owner = False
+
+        self.name = self.shared_memory.name
+        self.array = np.ndarray(self.shape, dtype=self.dtype, buffer=self.shared_memory.buf)
+
+    def close(self):
+        self.array = None
+        self.shared_memory.close()
+        if self.owner:
+            self.shared_memory.unlink()
+
+def create_pool(workers:int, initializer, initargs:tuple):
+    return multiprocessing.get_context().Pool(workers, initializer=initializer, initargs=initargs)
+
+def split(items:list, number_of_chunks:int):
+    # divide a lista em blocos contiguos, um por processo
+    size = -(-len(items) // number_of_chunks)
+    return [items[i:i + size] for i in range(0, len(items), size)]
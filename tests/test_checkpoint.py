@@ -0,0 +1,137 @@
+import numpy as np
+import pytest
+from aco import ACO
+from acoc import ACOC, ACOCGraph
+from callbacks import Checkpoint
+
+NUMBER_OF_VERTEX = 25
+
+def coordinates():
+    return np.random.default_rng(0).random((NUMBER_OF_VERTEX, 2))
+
+def aco(engine, update_strategy):
+    vertex_list = list(range(NUMBER_OF_VERTEX))
+    points = coordinates()
+    parameters = {'engine':engine, 'update_strategy':update_strategy, 'number_of_epochs':8, 'number_of_ants':6, 'seed':3, 'history':'best', 'autorun':False}
+    if engine == 'object':
+        distance = np.sqrt(np.square(points[:, np.newaxis] - points[np.newaxis]).sum(axis=-1))
+        distance_dict = {i:{j:float(distance[i, j]) for j in vertex_list if j != i} for i in vertex_list}
+        return ACO(vertex_list, distance_dict, **parameters)
+    return ACO(vertex_list, None, coordinates=points, candidate_list_size=8, **parameters)
+
+@pytest.mark.parametrize('update_strategy', ['as', 'mmas', 'acs'])
+@pytest.mark.parametrize('engine', ['object', 'matrix', 'sparse'])
+def test_aco_resume_matches_uninterrupted_run(tmp_path, engine, update_strategy):
+    uninterrupted = aco(engine, update_strategy)
+    uninterrupted.run(8)
+
+    interrupted = aco(engine, update_strategy)
+    interrupted.run(3)
+    interrupted.save_checkpoint(str(tmp_path/'aco.npz'))
+
+    resumed = aco(engine, update_strategy)
+    resumed.load_checkpoint(str(tmp_path/'aco.npz'))
+    resumed.run(5)
+
+    assert resumed.epoch == uninterrupted.epoch
+    assert resumed.best_ant.calculate_distance() == uninterrupted.best_ant.calculate_distance()
+    np.testing.assert_array_equal(resumed.best_ant.compact_tour(), uninterrupted.best_ant.compact_tour())
+    np.testing.assert_allclose(resumed.graph.get_pheromone(), uninterrupted.graph.get_pheromone())
+    np.testing.assert_array_equal(resumed.history.best_costs, uninterrupted.history.best_costs)
+
+def test_aco_checkpoint_before_first_epoch(tmp_path):
+    colony = aco('matrix', 'as')
+    colony.save_checkpoint(str(tmp_path/'aco.npz'))
+
+    resumed = aco('matrix', 'as')
+    resumed.load_checkpoint(str(tmp_path/'aco.npz'))
+    assert resumed.best_ant is None and resumed.epoch == 0
+
+def test_aco_checkpoint_rejects_different_parameters(tmp_path):
+    colony = aco('matrix', 'as')
+    colony.run(1)
+    colony.save_checkpoint(str(tmp_path/'aco.npz'))
+
+    with pytest.raises(Exception):
+        aco('matrix', 'mmas').load_checkpoint(str(tmp_path/'aco.npz'))
+
+def acoc(data):
+    graph = ACOCGraph(data=data, number_of_clusters=3)
+    return ACOC(graph, number_of_epochs=6, number_of_clusters=3, number_of_ant=5, distance_expoent=1, pheromone_expoent=1,
+                number_of_elite=2, evaporation_constant=0.05, strategy='random', seed=1, archive_size=2, autorun=False)
+
+def test_acoc_resume_matches_uninterrupted_run(tmp_path):
+    data = np.random.default_rng(0).random((60, 3))
+
+    uninterrupted = acoc(data)
+    uninterrupted.run(6)
+
+    interrupted = acoc(data)
+    interrupted.run(2)
+    interrupted.save_checkpoint(str(tmp_path/'acoc.npz'))
+
+    resumed = acoc(data)
+    resumed.load_checkpoint(str(tmp_path/'acoc.npz'))
+    resumed.run(4)
+
+    assert resumed.better_solution.evaluate_solution() == uninterrupted.better_solution.evaluate_solution()
+    np.testing.assert_array_equal(resumed.better_solution.compact_solution(), uninterrupted.better_solution.compact_solution())
+    np.testing.assert_allclose(resumed.graph.matrix, uninterrupted.graph.matrix)
+
+def test_acoc_checkpoint_with_empty_archive(tmp_path):
+    data = np.random.default_rng(0).random((60, 3))
+    acoc(data).save_checkpoint(str(tmp_path/'acoc.npz'))
+
+    resumed = acoc(data)
+    resumed.load_checkpoint(str(tmp_path/'acoc.npz'))
+    assert resumed.better_solution is None and resumed.epoch == 0
+
+def interrupt_at(algorithm, interrupted_epoch):
+    # a época interrupted_epoch é interrompida como numa preempção, depois da atualização do feromonio e antes do historico
+    record = algorithm.history.record
+    calls = []
+    def interrupted_record(*arguments):
+        calls.append(None)
+        if len(calls) == interrupted_epoch:
+            raise KeyboardInterrupt
+        return record(*arguments)
+    algorithm.history.record = interrupted_record
+
+@pytest.mark.parametrize('engine', ['object', 'matrix', 'sparse'])
+def test_aco_checkpoint_callback_survives_interruption(tmp_path, engine):
+    uninterrupted = aco(engine, 'mmas')
+    uninterrupted.run(8)
+
+    interrupted = aco(engine, 'mmas')
+    interrupt_at(interrupted, 5)
+    with pytest.raises(KeyboardInterrupt):
+        interrupted.run(8, callbacks=[Checkpoint(str(tmp_path/'aco.npz'), every=2)])
+    assert interrupted.epoch == 4
+
+    resumed = aco(engine, 'mmas')
+    resumed.load_checkpoint(str(tmp_path/'aco.npz'))
+    assert resumed.epoch == 4 and len(resumed.history.best_costs) == 4
+    resumed.run(8 - resumed.epoch)
+
+    assert resumed.best_ant.calculate_distance() == uninterrupted.best_ant.calculate_distance()
+    np.testing.assert_allclose(resumed.graph.get_pheromone(), uninterrupted.graph.get_pheromone())
+    np.testing.assert_array_equal(resumed.history.best_costs, uninterrupted.history.best_costs)
+
+def test_acoc_checkpoint_callback_survives_interruption(tmp_path):
+    data = np.random.default_rng(0).random((60, 3))
+
+    uninterrupted = acoc(data)
+    uninterrupted.run(6)
+
+    interrupted = acoc(data)
+    interrupt_at(interrupted, 5)
+    with pytest.raises(KeyboardInterrupt):
+        interrupted.run(6, callbacks=[Checkpoint(str(tmp_path/'acoc.npz'), every=2)])
+
+    resumed = acoc(data)
+    resumed.load_checkpoint(str(tmp_path/'acoc.npz'))
+    assert resumed.epoch == 4
+    resumed.run(6 - resumed.epoch)
+
+    assert resumed.better_solution.evaluate_solution() == uninterrupted.better_solution.evaluate_solution()
+    np.testing.assert_allclose(resumed.graph.matrix, uninterrupted.graph.matrix)
@@ -0,0 +1,117 @@
+import numpy as np
+import pytest
+from aco import ACO
+
+NUMBER_OF_VERTEX = 30
+CANDIDATE_LIST_SIZE = 8
+
+def euclidean(points):
+    return np.sqrt(np.square(points[:, np.newaxis] - points[np.newaxis]).sum(axis=-1))
+
+def delta(seed:int=0):
+    # instancia inicial, instancia esperada depois do delta e o delta: 4 arestas alteradas, 3 vertices novos e 3 removidos
+    rng = np.random.default_rng(seed)
+    points = rng.random((NUMBER_OF_VERTEX, 2))
+    vertex_list = [str(i) for i in range(NUMBER_OF_VERTEX)]
+    distance = euclidean(points)
+
+    new_points = rng.random((3, 2))
+    new_vertex_list = vertex_list[3:] + ['n{}'.format(i) for i in range(3)]
+    new_distance = euclidean(np.vstack([points[3:], new_points]))
+    added_vertices = {vertex:{other:float(new_distance[i, j]) for j, other in enumerate(new_vertex_list) if other != vertex}
+                      for i, vertex in enumerate(new_vertex_list) if vertex.startswith('n')}
+
+    changed_edges = {}
+    for i, j in [(3, 4), (10, 20), (25, 7), (12, 13)]:
+        changed_edges[(vertex_list[i], vertex_list[j])] = float(distance[i, j]*1.5)
+        new_distance[new_vertex_list.index(vertex_list[i]), new_vertex_list.index(vertex_list[j])] = distance[i, j]*1.5
+
+    return vertex_list, distance, new_vertex_list, new_distance, (changed_edges, added_vertices, vertex_list[:3])
+
+def sorted_candidate_distances(distance, candidates):
+    # vertices com a mesma distancia podem aparecer em qualquer ordem, então são comparadas as distancias
+    return np.sort(distance[np.arange(len(candidates))[:, np.newaxis], candidates], axis=1)
+
+@pytest.mark.parametrize('update_strategy', ['as', 'mmas', 'acs'])
+def test_matrix_apply_delta_matches_fresh_graph(update_strategy):
+    vertex_list, distance, new_vertex_list, new_distance, changes = delta()
+    distance_matrix = distance.copy()
+    aco = ACO(vertex_list, None, engine='matrix', distance_matrix=distance_matrix, number_of_epochs=5, number_of_ants=5,
+              candidate_list_size=CANDIDATE_LIST_SIZE, seed=0, update_strategy=update_strategy, autorun=False)
+    aco.run(5)
+    aco.apply_delta(*changes)
+
+    # a matriz do chamador não pode ser alterada, outras colonias podem compartilhar a mesma matriz
+    np.testing.assert_array_equal(distance_matrix, distance)
+
+    graph = aco.graph
+    assert graph.vertex_list == new_vertex_list
+    np.testing.assert_allclose(graph.distance_matrix, new_distance)
+
+    heuristic = graph.heuristic(aco.distance_expoent).copy()
+    weights = graph.weights(aco.distance_expoent, aco.pheromone_expoent).copy()
+    candidates = graph.candidate_list(CANDIDATE_LIST_SIZE).copy()
+    graph.heuristic_matrix = None
+    graph.weight_matrix = None
+    graph.candidate_lists = {}
+
+    np.testing.assert_allclose(heuristic, graph.heuristic(aco.distance_expoent))
+    np.testing.assert_allclose(weights, graph.weights(aco.distance_expoent, aco.pheromone_expoent))
+    np.testing.assert_array_equal(sorted_candidate_distances(new_distance, candidates),
+                                  sorted_candidate_distances(new_distance, graph.candidate_list(CANDIDATE_LIST_SIZE)))
+
+    fresh = ACO(new_vertex_list, None, engine='matrix', distance_matrix=new_distance, number_of_epochs=1,
+                candidate_list_size=CANDIDATE_LIST_SIZE, seed=0, update_strategy=update_strategy, autorun=False)
+    np.testing.assert_allclose(heuristic, fresh.graph.heuristic(aco.distance_expoent))
+
+    # a melhor formiga reparada visita todos os vertices da nova instancia
+    assert sorted(aco.best_ant.visited_vertex) == sorted(new_vertex_list)
+    aco.run(2)
+
+def fresh_heuristic(vertex_list, distance, distance_expoent):
+    return ACO(vertex_list, None, engine='matrix', distance_matrix=distance, number_of_epochs=1, autorun=False).graph.heuristic(distance_expoent)
+
+def test_matrix_apply_delta_does_not_affect_other_colony():
+    vertex_list, distance, new_vertex_list, new_distance, changes = delta()
+    distance_matrix = distance.copy()
+    first = ACO(vertex_list, None, engine='matrix', distance_matrix=distance_matrix, number_of_epochs=2, seed=0, autorun=False)
+    second = ACO(vertex_list, None, engine='matrix', distance_matrix=distance_matrix, number_of_epochs=2, seed=0, autorun=False)
+    first.run(2)
+    second.run(2)
+    first.apply_delta(changes[0])
+
+    np.testing.assert_array_equal(second.graph.distance_matrix, distance)
+    np.testing.assert_array_equal(second.graph.heuristic(second.distance_expoent), fresh_heuristic(vertex_list, distance, second.distance_expoent))
+
+def test_object_apply_delta_matches_fresh_graph():
+    vertex_list, distance, new_vertex_list, new_distance, changes = delta()
+    distance_dict = {vertex:{other:float(distance[i, j]) for j, other in enumerate(vertex_list) if other != vertex} for i, vertex in enumerate(vertex_list)}
+    original = {vertex:dict(row) for vertex, row in distance_dict.items()}
+    aco = ACO(vertex_list, distance_dict, engine='object', number_of_epochs=3, number_of_ants=5,
+              candidate_list_size=CANDIDATE_LIST_SIZE, seed=0, autorun=False)
+    aco.run(3)
+    aco.apply_delta(*changes)
+
+    assert distance_dict == original
+
+    graph = aco.graph
+    index = {vertex:i for i, vertex in enumerate(new_vertex_list)}
+    assert sorted(graph.vertex_list) == sorted(new_vertex_list)
+    assert len(graph.arris_list) == len(new_vertex_list)*(len(new_vertex_list) - 1)
+    for arris in graph.arris_list:
+        assert arris.distance == pytest.approx(new_distance[index[arris.origin], index[arris.destination]])
+
+    candidates = {vertex:sorted(arris.distance for arris in arris_list) for vertex, arris_list in graph.candidate_list(CANDIDATE_LIST_SIZE).items()}
+    graph.candidate_lists = {}
+    fresh = {vertex:sorted(arris.distance for arris in arris_list) for vertex, arris_list in graph.candidate_list(CANDIDATE_LIST_SIZE).items()}
+    assert candidates == fresh
+
+    assert sorted(aco.best_ant.visited_vertex) == sorted(new_vertex_list)
+    aco.run(2)
+
+def test_sparse_apply_delta_raises():
+    vertex_list, distance, new_vertex_list, new_distance, changes = delta()
+    coordinates = np.random.default_rng(0).random((NUMBER_OF_VERTEX, 2))
+    aco = ACO(vertex_list, None, engine='sparse', coordinates=coordinates, number_of_epochs=1, candidate_list_size=CANDIDATE_LIST_SIZE, autorun=False)
+    with pytest.raises(Exception):
+        aco.apply_delta(*changes)
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+from local_search import LOCAL_SEARCH_METHODS, improve_tour, tour_length
+
+def instance(number_of_vertex, seed, duplicates=False):
+    rng = np.random.default_rng(seed)
+    coordinates = rng.random((number_of_vertex, 2))
+    if duplicates:
+        # vertices repetidos dão distancias zero, empates entre os movimentos e, na lista de vizinhos, o proprio vertice
+        coordinates[1::4] = coordinates[::4][:len(coordinates[1::4])]
+    distance = np.sqrt(np.square(coordinates[:, np.newaxis] - coordinates[np.newaxis]).sum(axis=-1))
+    neighbours = np.argsort(distance, axis=1)[:, 1:11]
+    return distance, neighbours, rng.permutation(number_of_vertex)
+
+@pytest.mark.parametrize('method', LOCAL_SEARCH_METHODS)
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('number_of_vertex', [5, 12, 60])
+def test_result_is_a_permutation_not_longer_than_the_input(method, seed, number_of_vertex):
+    distance, neighbours, tour = instance(number_of_vertex, seed)
+    improved = improve_tour(tour.copy(), distance, neighbours, method)
+
+    assert sorted(np.asarray(improved).tolist()) == list(range(number_of_vertex))
+    assert tour_length(np.asarray(improved), distance) <= tour_length(tour, distance) + 1e-9
+
+@pytest.mark.parametrize('method', LOCAL_SEARCH_METHODS)
+def test_duplicate_coordinates(method):
+    distance, neighbours, tour = instance(40, 0, duplicates=True)
+    improved = improve_tour(tour.copy(), distance, neighbours, method)
+
+    assert sorted(np.asarray(improved).tolist()) == list(range(40))
+    assert tour_length(np.asarray(improved), distance) <= tour_length(tour, distance) + 1e-9
+
+@pytest.mark.parametrize('method', LOCAL_SEARCH_METHODS)
+def test_list_neighbours(method):
+    # listas de vizinhos como listas de listas, como as do SparseGraph com adjacency
+    distance, neighbours, tour = instance(30, 1)
+    improved = improve_tour(tour.copy(), distance, neighbours.tolist(), method)
+
+    assert sorted(np.asarray(improved).tolist()) == list(range(30))
+    assert tour_length(np.asarray(improved), distance) <= tour_length(tour, distance) + 1e-9
+
+def test_invalid_method():
+    distance, neighbours, tour = instance(10, 0)
+    with pytest.raises(Exception):
+        improve_tour(tour, distance, neighbours, '3-opt')
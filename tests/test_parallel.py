@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+from aco import ACO
+from acoc import ACOC, ACOCGraph
+
+# cada formiga tem um gerador derivado da época e do seu indice, então o resultado não depende do numero de processos
+
+def aco(workers, update_strategy, candidate_list_size):
+    coordinates = np.random.default_rng(0).random((40, 2))
+    return ACO(list(range(40)), None, engine='matrix', coordinates=coordinates, number_of_epochs=5, number_of_ants=12,
+               candidate_list_size=candidate_list_size, update_strategy=update_strategy, seed=7, workers=workers, history='best')
+
+@pytest.mark.parametrize('update_strategy', ['as', 'mmas'])
+@pytest.mark.parametrize('candidate_list_size', [None, 8])
+def test_aco_result_does_not_depend_on_workers(update_strategy, candidate_list_size):
+    serial = aco(None, update_strategy, candidate_list_size)
+    parallel = aco(3, update_strategy, candidate_list_size)
+
+    assert parallel.best_ant.calculate_distance() == serial.best_ant.calculate_distance()
+    np.testing.assert_array_equal(parallel.best_ant.compact_tour(), serial.best_ant.compact_tour())
+    np.testing.assert_allclose(parallel.graph.get_pheromone(), serial.graph.get_pheromone())
+    np.testing.assert_array_equal(parallel.history.best_costs, serial.history.best_costs)
+
+def acoc(workers):
+    data = np.random.default_rng(0).random((80, 3))
+    graph = ACOCGraph(data=data, number_of_clusters=3)
+    return ACOC(graph, number_of_epochs=4, number_of_clusters=3, number_of_ant=6, distance_expoent=1, pheromone_expoent=1,
+                number_of_elite=2, evaporation_constant=0.05, strategy='random', seed=7, workers=workers)
+
+def test_acoc_result_does_not_depend_on_workers():
+    serial = acoc(None)
+    parallel = acoc(3)
+
+    assert parallel.better_solution.evaluate_solution() == serial.better_solution.evaluate_solution()
+    np.testing.assert_array_equal(parallel.better_solution.compact_solution(), serial.better_solution.compact_solution())
+    np.testing.assert_allclose(parallel.graph.matrix, serial.graph.matrix)
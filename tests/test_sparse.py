@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+import aco
+from aco import SparseGraph, haversine_metric
+
+def neighbour_distances(graph, coordinates, metric):
+    return np.sort(metric(coordinates[:, np.newaxis], coordinates[graph.neighbours]), axis=1)
+
+@pytest.mark.parametrize('metric', ['euclidean', 'haversine'])
+def test_kd_tree_neighbours_match_blocked_scan(monkeypatch, metric):
+    pytest.importorskip('scipy')
+    rng = np.random.default_rng(0)
+    coordinates = np.column_stack([rng.uniform(-80, 80, 400), rng.uniform(-180, 180, 400)])
+    vertex_list = list(range(len(coordinates)))
+
+    kd_tree_graph = SparseGraph(vertex_list, coordinates=coordinates, metric=metric)
+    monkeypatch.setattr(aco, 'kd_tree', lambda: None)
+    blocked_graph = SparseGraph(vertex_list, coordinates=coordinates, metric=metric)
+
+    np.testing.assert_allclose(neighbour_distances(kd_tree_graph, coordinates, aco.METRICS[metric]),
+                               neighbour_distances(blocked_graph, coordinates, aco.METRICS[metric]))
+
+def test_haversine_edges_use_great_circle_distance():
+    rng = np.random.default_rng(1)
+    coordinates = np.column_stack([rng.uniform(-80, 80, 200), rng.uniform(-180, 180, 200)])
+    graph = SparseGraph(list(range(len(coordinates))), coordinates=coordinates, metric='haversine')
+
+    # as arestas guardadas têm a distancia em km sobre a superficie, não a distancia na esfera unitaria
+    origin = np.repeat(np.arange(len(coordinates)), np.diff(graph.indptr))
+    np.testing.assert_allclose(graph.edge_distance, haversine_metric(coordinates[origin], coordinates[graph.indices]))
+    assert haversine_metric(np.array([0.0, 0.0]), np.array([0.0, 1.0])) == pytest.approx(111.19, rel=1e-3)
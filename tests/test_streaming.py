@@ -0,0 +1,86 @@
+import os
+import numpy as np
+import pytest
+from acoc import ACOCGraph, StreamingACOC
+from loader import load_array
+
+def streaming(data, batch_size=32):
+    graph = ACOCGraph(data=data, number_of_clusters=3)
+    return StreamingACOC(graph, number_of_epochs=2, number_of_clusters=3, number_of_ant=4, distance_expoent=1, pheromone_expoent=1,
+                         number_of_elite=2, evaporation_constant=0.05, batch_size=batch_size, strategy='random', seed=2, autorun=False)
+
+def assert_bookkeeping(solution, graph):
+    # as somas, quantidades e somas de distancias mantidas a cada mudança são as mesmas de um recalculo a partir dos labels
+    data = np.asarray(graph.data, dtype=np.float64)
+    labels = solution.labels
+    assert len(labels) == len(solution.distances) == graph.number_of_objects == len(graph.matrix)
+
+    sums = np.zeros_like(solution.sums)
+    np.add.at(sums, labels, data)
+    np.testing.assert_allclose(solution.sums, sums)
+    np.testing.assert_array_equal(solution.counts, np.bincount(labels, minlength=graph.number_of_clusters))
+    np.testing.assert_allclose(solution.distance_sums, np.bincount(labels, weights=solution.distances, minlength=graph.number_of_clusters))
+
+def batches(number_of_batches, seed=1):
+    rng = np.random.default_rng(seed)
+    return [rng.random((int(rng.integers(1, 40)), 3)) for _ in range(number_of_batches)]
+
+def test_partial_fit_keeps_bookkeeping_consistent():
+    initial = np.random.default_rng(0).random((50, 3))
+    acoc = streaming(initial)
+    acoc.run(2)
+
+    arrived = batches(10)
+    for batch in arrived:
+        acoc.partial_fit(batch, number_of_epochs=2)
+        assert_bookkeeping(acoc.better_solution, acoc.graph)
+
+    np.testing.assert_array_equal(acoc.graph.data, np.concatenate([initial] + arrived))
+    assert acoc.epoch == 22
+
+    # o custo incremental é o mesmo de uma solução montada do zero com os mesmos labels e distancias
+    distance_sums = np.bincount(acoc.better_solution.labels, weights=acoc.better_solution.distances, minlength=3)
+    counts = np.bincount(acoc.better_solution.labels, minlength=3)
+    assert acoc.better_solution.evaluate_solution() == pytest.approx(float((distance_sums/np.maximum(counts, 1)).sum()))
+
+def test_extend_grows_buffers_without_copying_every_time():
+    graph = ACOCGraph(data=np.zeros((4, 2)), number_of_clusters=2)
+    graph.append_objects(np.ones((1, 2)))
+    buffer = graph.buffers['data']
+    for i in range(3):
+        graph.append_objects(np.full((1, 2), i + 2.0))
+
+    # a capacidade dobrou na primeira vez, os acrescimos seguintes cabem no mesmo buffer
+    assert graph.buffers['data'] is buffer and graph.data.base is buffer
+    np.testing.assert_array_equal(graph.data[:, 0], [0, 0, 0, 0, 1, 2, 3, 4])
+    np.testing.assert_array_equal(graph.matrix, np.full((8, 2), graph.initial_pheromone))
+
+def test_extend_requires_target_when_graph_has_target():
+    graph = ACOCGraph(data=np.zeros((4, 2)), target=np.zeros(4), number_of_clusters=2)
+    with pytest.raises(Exception):
+        graph.append_objects(np.ones((1, 2)))
+
+def test_append_to_memory_mapped_data(tmp_path):
+    initial = np.random.default_rng(0).random((60, 3))
+    path = str(tmp_path/'x.npy')
+    np.save(path, initial)
+
+    data, target = load_array(path, mmap=True)
+    assert isinstance(data, np.memmap)
+    acoc = streaming(data)
+    acoc.run(1)
+
+    arrived = batches(6)
+    for batch in arrived:
+        acoc.partial_fit(batch)
+        assert_bookkeeping(acoc.better_solution, acoc.graph)
+
+    # os objetos acrescentados vão para um .npy mapeado ao lado do original, que não é alterado
+    assert isinstance(acoc.graph.data, np.memmap)
+    assert os.path.abspath(acoc.graph.data.filename) == os.path.abspath(str(tmp_path/'x-data-stream.npy'))
+    np.testing.assert_array_equal(acoc.graph.data, np.concatenate([initial] + arrived))
+    np.testing.assert_array_equal(np.load(path), initial)
+
+    # o arquivo é um .npy valido, com os objetos acrescentados no inicio
+    stream = np.load(str(tmp_path/'x-data-stream.npy'), mmap_mode='r')
+    np.testing.assert_array_equal(stream[:acoc.graph.number_of_objects], acoc.graph.data)